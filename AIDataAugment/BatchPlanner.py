@@ -0,0 +1,81 @@
+import math
+
+
+class BatchPlanner:
+    # Packs rows into batch prompts against token budgets.
+    #
+    # Each row costs input tokens (its text plus one placeholder line per requested version)
+    # and output tokens (one marker plus a rewritten text per version). Rows are packed
+    # first-fit-decreasing on output tokens, which is what truncates a batch, while also
+    # respecting the input budget. Rows that do not fit in an empty prompt are returned
+    # separately so the caller can spread their versions over several calls.
+    def __init__(self, output_token_budget, input_token_budget=None, chars_per_token=4.0, output_ratio=1.1,
+                 prompt_overhead_chars=0, row_overhead_chars=0, version_line_chars=0, marker_chars=24):
+        self.output_token_budget = output_token_budget
+        self.input_token_budget = input_token_budget
+        self.chars_per_token = chars_per_token
+        self.output_ratio = output_ratio
+        self.prompt_overhead_chars = prompt_overhead_chars
+        self.row_overhead_chars = row_overhead_chars
+        self.version_line_chars = version_line_chars
+        self.marker_chars = marker_chars
+
+    def tokens(self, chars):
+        return int(math.ceil(chars / self.chars_per_token))
+
+    def version_output_tokens(self, text_length):
+        return self.tokens(text_length * self.output_ratio + self.marker_chars)
+
+    def row_cost(self, text_length, num_versions):
+        input_tokens = self.tokens(text_length + self.row_overhead_chars + num_versions * self.version_line_chars)
+        output_tokens = num_versions * self.version_output_tokens(text_length)
+        return input_tokens, output_tokens
+
+    def max_versions_per_prompt(self, text_length):
+        return max(1, int(self.output_token_budget // self.version_output_tokens(text_length)))
+
+    def pack(self, text_lengths, num_versions):
+        # Returns (bins, oversized): bins are lists of indices into text_lengths.
+        input_budget = self.input_token_budget
+        if input_budget is not None:
+            input_budget -= self.tokens(self.prompt_overhead_chars)
+        costs = [self.row_cost(length, num_versions) for length in text_lengths]
+        order = sorted(range(len(costs)), key=lambda i: costs[i][1], reverse=True)
+        bins = []
+        loads = []
+        oversized = []
+
+        for i in order:
+            input_tokens, output_tokens = costs[i]
+            if output_tokens > self.output_token_budget or (input_budget is not None and input_tokens > input_budget):
+                oversized.append(i)
+                continue
+
+            for b, (input_load, output_load) in enumerate(loads):
+                if output_load + output_tokens <= self.output_token_budget and (input_budget is None or input_load + input_tokens <= input_budget):
+                    bins[b].append(i)
+                    loads[b] = (input_load + input_tokens, output_load + output_tokens)
+                    break
+            else:
+                bins.append([i])
+                loads.append((input_tokens, output_tokens))
+
+        return bins, oversized
+
+    def report(self, text_lengths, num_versions):
+        bins, oversized = self.pack(text_lengths, num_versions)
+        single_calls = sum(
+            math.ceil(num_versions / self.max_versions_per_prompt(text_lengths[i])) for i in oversized
+        )
+        output_tokens = sum(self.row_cost(text_lengths[i], num_versions)[1] for b in bins for i in b)
+        input_tokens = sum(self.row_cost(length, num_versions)[0] for length in text_lengths)
+        input_tokens += (len(bins) + single_calls) * self.tokens(self.prompt_overhead_chars)
+        return {
+            "rows": len(text_lengths),
+            "calls": len(bins) + single_calls,
+            "batch_calls": len(bins),
+            "single_row_calls": single_calls,
+            "expected_fill_ratio": output_tokens / (len(bins) * self.output_token_budget) if bins else 0.0,
+            "estimated_input_tokens": input_tokens,
+            "estimated_output_tokens": output_tokens + sum(num_versions * self.version_output_tokens(text_lengths[i]) for i in oversized),
+        }
@@ -0,0 +1,228 @@
+import json
+import os
+import time
+from .FileFormats import _pandas
+
+
+class CheckpointWriter:
+    # Append-only output writer with a sidecar journal of completed source rows.
+    #
+    # Rows are buffered and appended to the output file every `flush_every` rows or
+    # `flush_interval` seconds. A journal line is appended after each flush with the
+    # first source position that is not complete yet ("next") and the positions
+    # completed by this flush beyond it ("added"). Batches complete positions all over the
+    # planner window, so re-serializing every position ahead of "next" on each line would
+    # make the journal grow with the square of the window; instead a line carries the full
+    # set ("ahead") only once the deltas written since the last such line are as large as
+    # it, and resuming reads the journal backwards up to that line.
+    # The line also records the size of the data file ("bytes"). Data is appended before
+    # its journal line, so after a crash the data file is truncated back to the journaled
+    # size on resume: rows that were written but not journaled are generated again
+    # instead of being duplicated.
+    # Formats that cannot be appended to (Excel, Parquet, Arrow) get their rows in a spool
+    # that keeps their types (see FileFormat), written into the real file once, on close():
+    # the output is rewritten to a temporary file, a "materialized" line is journaled, then
+    # the temporary file replaces the output and the spool is removed. Resuming from a
+    # "materialized" line finishes those two steps, so a crash in between neither loses nor
+    # duplicates rows.
+    # on_flush(rows, bytes, seconds) is called after every flush that wrote rows.
+    # A read_only writer (dry runs) reads the journal as it is, without repairing it or
+    # truncating the data file, and only tracks positions in memory: it never writes.
+    def __init__(self, output_filename, file_format, flush_every=100, flush_interval=5.0, fsync_every=1, on_flush=None, read_only=False):
+        self.output_filename = output_filename
+        self.file_format = file_format
+        self.flush_every = max(1, flush_every)
+        self.flush_interval = flush_interval
+        self.fsync_every = fsync_every
+        self.on_flush = on_flush
+        self.read_only = read_only
+        self.journal_path = output_filename + ".journal"
+        self.spool_path = None if file_format.appendable else output_filename + file_format.spool_suffix
+        self.data_path = self.spool_path or output_filename
+        self.tmp_path = output_filename + ".tmp"
+        self.rows_written = 0
+        self.bytes_written = 0
+        self._frames = []
+        self._buffered_rows = 0
+        self._positions = []
+        self._flushes = 0
+        self._last_flush = time.monotonic()
+        self._since_snapshot = None  # Positions journaled as deltas since the last full "ahead" line
+        self._next, self._ahead = self.resume_state()
+
+    def resume_state(self):
+        if not os.path.exists(self.journal_path):
+            return 0, set()
+        if not self.read_only:
+            self._repair_journal()
+        size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        lines = self._journal_lines()
+        for line in lines:
+            state = json.loads(line)
+            # A state whose rows are not all in the data file (lost with fsync disabled) is
+            # skipped for an earlier one.
+            if state.get("bytes", 0) <= size:
+                break
+        else:
+            return 0, set()
+        if not self.read_only and self.spool_path is not None:
+            if state.get("materialized"):
+                self._finish_materialize()
+                size = 0
+            elif os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)  # Left by a crash before its "materialized" line
+        if not self.read_only and "bytes" in state and size > state["bytes"]:
+            with open(self.data_path, "r+b") as data:
+                data.truncate(state["bytes"])
+        self.rows_written = state.get("rows", 0)
+
+        # Deltas back to the last full "ahead" set; positions since folded into "next" drop out.
+        ahead = set()
+        entry = state
+        while entry is not None and "ahead" not in entry:
+            ahead.update(entry.get("added", []))
+            line = next(lines, None)
+            entry = json.loads(line) if line is not None else None
+        if entry is not None:
+            ahead.update(entry["ahead"])
+        return state["next"], {position for position in ahead if position >= state["next"]}
+
+    def _repair_journal(self):
+        # Cuts a last line torn by a crash (it has no newline yet) so new lines start clean.
+        with open(self.journal_path, "r+b") as journal:
+            end = journal.seek(0, os.SEEK_END)
+            position = end
+            while position > 0:
+                step = min(4096, position)
+                position -= step
+                journal.seek(position)
+                newline = journal.read(step).rfind(b"\n")
+                if newline >= 0:
+                    if position + newline + 1 < end:
+                        journal.truncate(position + newline + 1)
+                    return
+            journal.truncate(0)
+
+    def _journal_lines(self):
+        # Yields the journal's lines from the last one backwards, reading it in blocks. A last
+        # line torn by a crash (no newline yet) is skipped.
+        with open(self.journal_path, "rb") as journal:
+            position = journal.seek(0, os.SEEK_END)
+            rest = b""
+            torn = position > 0
+            while position > 0:
+                step = min(4096, position)
+                position -= step
+                journal.seek(position)
+                lines = (journal.read(step) + rest).split(b"\n")
+                rest = lines.pop(0)
+                for line in reversed(lines):
+                    if not torn and line.strip():
+                        yield line.decode("utf-8")
+                    torn = False
+            if not torn and rest.strip():
+                yield rest.decode("utf-8")
+
+    @property
+    def next_position(self):
+        return self._next
+
+    def is_complete(self, position):
+        return position < self._next or position in self._ahead
+
+    def add(self, rows, positions):
+        # rows is a DataFrame of output rows (or None) completing the source positions.
+        if rows is not None and len(rows):
+            if self.read_only:
+                raise ValueError("Cannot add rows to a read-only checkpoint.")
+            self._frames.append(rows)
+            self._buffered_rows += len(rows)
+        self._positions.extend(positions)
+        if self._buffered_rows >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        self._last_flush = time.monotonic()
+        if not self._frames and not self._positions:
+            return
+
+        start = time.perf_counter()
+        bytes_written = self.bytes_written
+        if self._frames:
+            self._append(_pandas().concat(self._frames, ignore_index=True) if len(self._frames) > 1 else self._frames[0])
+            self.rows_written += self._buffered_rows
+
+        self._ahead.update(self._positions)
+        while self._next in self._ahead:
+            self._ahead.remove(self._next)
+            self._next += 1
+
+        if self.read_only:
+            self._positions = []
+            return
+
+        self._flushes += 1
+        self._write_journal(self.fsync_every and self._flushes % self.fsync_every == 0, self._positions)
+
+        if self._frames and self.on_flush is not None:
+            self.on_flush(self._buffered_rows, self.bytes_written - bytes_written, time.perf_counter() - start)
+        self._frames = []
+        self._buffered_rows = 0
+        self._positions = []
+
+    def _write_journal(self, sync, positions=(), materialized=False):
+        size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) and not materialized else 0
+        entry = {"next": self._next, "rows": self.rows_written, "bytes": size}
+        if materialized:
+            entry["materialized"] = True  # The spool is in tmp_path, or already in the output
+        added = sorted({position for position in positions if position in self._ahead})
+        # The first line of a run is always a full set, so resuming never reads past it.
+        if self._since_snapshot is None or self._since_snapshot + len(added) >= len(self._ahead):
+            entry["ahead"] = sorted(self._ahead)
+            self._since_snapshot = 0
+        else:
+            entry["added"] = added
+            self._since_snapshot += len(added)
+        with open(self.journal_path, "a", encoding="utf-8") as journal:
+            journal.write(json.dumps(entry) + "\n")
+            if sync:
+                journal.flush()
+                os.fsync(journal.fileno())
+
+    def _append(self, df_new_rows):
+        if self.spool_path is not None:
+            output = open(self.spool_path, "ab")
+        else:
+            output = open(self.output_filename, "a", encoding="utf-8", newline="")
+        with output:
+            start = output.tell()
+            if self.spool_path is not None:
+                self.file_format.write_spool_chunk(output, df_new_rows)
+            else:
+                self.file_format.write_chunk(output, df_new_rows, start == 0)
+            self.bytes_written += output.tell() - start
+            if self.fsync_every and (self._flushes + 1) % self.fsync_every == 0:
+                output.flush()
+                os.fsync(output.fileno())
+
+    def close(self):
+        self.flush()
+        if self.read_only:
+            return
+        if not os.path.exists(self.journal_path):
+            self._write_journal(bool(self.fsync_every))  # Nothing was written: record that the run finished
+        # Safe to call again: once the spool is gone there is nothing left to do.
+        if self.spool_path and os.path.exists(self.spool_path):
+            if os.path.getsize(self.spool_path):
+                self.file_format.materialize_spool(self.output_filename, self.spool_path, self.tmp_path)
+                if self.fsync_every:
+                    with open(self.tmp_path, "rb") as tmp:
+                        os.fsync(tmp.fileno())
+            self._write_journal(bool(self.fsync_every), materialized=True)
+            self._finish_materialize()
+
+    def _finish_materialize(self):
+        if os.path.exists(self.tmp_path):
+            os.replace(self.tmp_path, self.output_filename)
+        if os.path.exists(self.spool_path):
+            os.remove(self.spool_path)
@@ -0,0 +1,344 @@
+import os
+import pickle
+import struct
+
+
+def _pandas():
+    # Imported on first use: it is the slowest part of importing the package.
+    import pandas
+    return pandas
+
+
+class FileFormat:
+    # Reader/writer for one family of file extensions.
+    #
+    # Appendable formats are written by appending text chunks to the output file. The other
+    # ones cannot grow in place, so CheckpointWriter appends their rows to a spool with
+    # write_spool_chunk() and calls materialize_spool() once at the end of the run. The
+    # default spool holds pickled DataFrames: it keeps every dtype and needs nothing beyond
+    # pandas; formats written through pyarrow spool Arrow tables instead.
+    #
+    # Such files are rewritten whole: _write_materialized() writes the rows already in path
+    # followed by the new chunks to a temporary file, which then replaces path, so a crash
+    # never leaves path half written.
+    extensions = ()
+    appendable = False
+    spool_suffix = ".spool.pickle"
+
+    def check_dependencies(self):
+        # Raises ImportError for a missing optional dependency, before any work is done.
+        pass
+
+    def read(self, path):
+        raise NotImplementedError
+
+    def read_chunks(self, path, chunksize):
+        frame = self.read(path)
+        for start in range(0, len(frame), chunksize):
+            yield frame.iloc[start:start + chunksize]
+
+    def count_rows(self, path):
+        return len(self.read(path))
+
+    def write_chunk(self, handle, df, header):
+        raise NotImplementedError
+
+    def materialize(self, path, chunks):
+        tmp_path = path + ".tmp"
+        self._write_materialized(path, chunks, tmp_path)
+        os.replace(tmp_path, path)
+
+    def _write_materialized(self, path, chunks, tmp_path):
+        # Must remove tmp_path when it fails.
+        raise NotImplementedError
+
+    def write_spool_chunk(self, handle, df):
+        _write_record(handle, pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def read_spool(self, spool_path):
+        # The spool is only ever written by write_spool_chunk, next to the output file.
+        for data in _read_records(spool_path):
+            yield pickle.loads(data)
+
+    def materialize_spool(self, path, spool_path, tmp_path):
+        # Writes the rows of path followed by the spooled ones to tmp_path; the caller replaces
+        # path with it.
+        self._write_materialized(path, self.read_spool(spool_path), tmp_path)
+
+    def write(self, path, df):
+        # Replaces path with the rows of df.
+        if os.path.exists(path):
+            os.remove(path)
+        if self.appendable:
+            with open(path, "w", encoding="utf-8", newline="") as handle:
+                self.write_chunk(handle, df, True)
+        else:
+            self.materialize(path, [df])
+
+
+class CsvFormat(FileFormat):
+    appendable = True
+
+    def __init__(self, extensions, sep):
+        self.extensions = extensions
+        self.sep = sep
+
+    def read(self, path):
+        return _pandas().read_csv(path, sep=self.sep)
+
+    def read_chunks(self, path, chunksize):
+        return _pandas().read_csv(path, sep=self.sep, chunksize=chunksize)
+
+    def count_rows(self, path):
+        return sum(len(chunk) for chunk in self.read_chunks(path, 100000))
+
+    def write_chunk(self, handle, df, header):
+        df.to_csv(handle, sep=self.sep, index=False, header=header)
+
+
+class JsonlFormat(FileFormat):
+    extensions = ('jsonl', 'ndjson')
+    appendable = True
+
+    # Values are read as they are written: no dtype guessing ("007" stays a string) and no
+    # date parsing (epoch numbers stay numbers).
+    def read(self, path):
+        return _pandas().read_json(path, lines=True, dtype=False, convert_dates=False)
+
+    def read_chunks(self, path, chunksize):
+        return _pandas().read_json(path, lines=True, chunksize=chunksize, dtype=False, convert_dates=False)
+
+    def count_rows(self, path):
+        with open(path, "rb") as handle:
+            return sum(1 for line in handle if line.strip())
+
+    def write_chunk(self, handle, df, header):
+        # Missing values are written as null, not as the NaN token strict parsers reject.
+        if len(df):
+            lines = df.to_json(orient="records", lines=True, force_ascii=False, date_format="iso", default_handler=str)
+            handle.write(lines if lines.endswith("\n") else lines + "\n")
+
+
+def _write_record(handle, data):
+    # Spools are a sequence of length-prefixed records, one per flush.
+    handle.write(struct.pack("<Q", len(data)))
+    handle.write(data)
+
+
+def _read_records(path):
+    # Yields the records of a spool; a record torn by a crash at the end of the file is ignored.
+    with open(path, "rb") as handle:
+        while True:
+            header = handle.read(8)
+            if len(header) < 8:
+                return
+            size, = struct.unpack("<Q", header)
+            data = handle.read(size)
+            if len(data) < size:
+                return
+            yield data
+
+
+class ExcelFormat(FileFormat):
+    extensions = ('xls', 'xlsx')
+
+    def read(self, path):
+        return _pandas().read_excel(path)
+
+    def _write_materialized(self, path, chunks, tmp_path):
+        pd = _pandas()
+        # dtype=object keeps cells as written, e.g. "007" stays a string.
+        frames = [pd.read_excel(path, dtype=object)] if os.path.exists(path) else []
+        frames.extend(chunks)
+        try:
+            # Written through a handle: pandas would reject the extension of the temporary file.
+            with open(tmp_path, "wb") as handle:
+                pd.concat(frames, ignore_index=True).to_excel(handle, index=False, engine="openpyxl")
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet and Arrow files require pyarrow. Install it with `pip install AIDataAugment[parquet]`.")
+    return pyarrow
+
+
+def unify_schemas(schemas):
+    # Null columns (all missing in a chunk) take the type of the other chunks, integers
+    # mixed with floats become float64 and any other conflict falls back to strings. The
+    # pandas metadata of a schema that already has the unified types is kept.
+    pa = _pyarrow()
+    types = {}
+    for schema in schemas:
+        for field in schema:
+            candidates = types.setdefault(field.name, [])
+            if not pa.types.is_null(field.type) and field.type not in candidates:
+                candidates.append(field.type)
+
+    fields = []
+    for name, candidates in types.items():
+        if not candidates:
+            field_type = pa.null()
+        elif len(candidates) == 1:
+            field_type = candidates[0]
+        elif all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in candidates):
+            field_type = pa.float64()
+        else:
+            field_type = pa.string()
+        fields.append(pa.field(name, field_type))
+
+    unified = pa.schema(fields)
+    for schema in schemas:
+        if schema.remove_metadata().equals(unified):
+            return unified.with_metadata(schema.metadata)
+    return unified
+
+
+def _cast_table(table, schema):
+    pa = _pyarrow()
+    columns = [
+        table.column(field.name).cast(field.type) if field.name in table.column_names else pa.nulls(table.num_rows, field.type)
+        for field in schema
+    ]
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+class ArrowTableFormat(FileFormat):
+    # Base of the formats written through pyarrow. The file is rewritten through a temporary
+    # file: rows already in it are copied first, then every chunk is appended, all cast to a
+    # schema unified over the existing file and every chunk (see unify_schemas).
+    #
+    # Spool records are Arrow IPC streams. Each chunk keeps the types pandas gave its rows
+    # (dates, strings of digits, ...) and carries its own schema; the schemas are only
+    # unified when the spool is materialized.
+    spool_suffix = ".spool.arrows"
+
+    def check_dependencies(self):
+        _pyarrow()
+
+    def write_spool_chunk(self, handle, df):
+        pa = _pyarrow()
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        _write_record(handle, sink.getvalue())
+
+    def read_spool(self, spool_path):
+        pa = _pyarrow()
+        for data in _read_records(spool_path):
+            yield pa.ipc.open_stream(pa.py_buffer(data)).read_all()
+
+    def _read_existing(self, path):
+        # Returns (schema, iterator of tables) for the rows already in path.
+        raise NotImplementedError
+
+    def _new_writer(self, path, schema):
+        raise NotImplementedError
+
+    def _write_materialized(self, path, chunks, tmp_path):
+        pa = _pyarrow()
+        tables = [chunk if isinstance(chunk, pa.Table) else pa.Table.from_pandas(chunk, preserve_index=False) for chunk in chunks]
+        self._write_tables(path, lambda: iter(tables), tmp_path)
+
+    def materialize_spool(self, path, spool_path, tmp_path):
+        # The spool is read twice, once for the schemas and once to write, so only one chunk
+        # is in memory at a time.
+        self._write_tables(path, lambda: self.read_spool(spool_path), tmp_path)
+
+    def _write_tables(self, path, tables, tmp_path):
+        existing_schema, existing = self._read_existing(path) if os.path.exists(path) else (None, iter(()))
+        schemas = ([existing_schema] if existing_schema is not None else []) + [table.schema for table in tables()]
+        schema = unify_schemas(schemas)
+
+        writer = self._new_writer(tmp_path, schema)
+        try:
+            for table in existing:
+                writer.write_table(_cast_table(table, schema))
+            for table in tables():
+                writer.write_table(_cast_table(table, schema))
+        except BaseException:
+            writer.close()
+            os.remove(tmp_path)
+            raise
+        writer.close()
+
+
+class ParquetFormat(ArrowTableFormat):
+    extensions = ('parquet', 'pq')
+
+    def read(self, path):
+        return _pyarrow().parquet.read_table(path).to_pandas()
+
+    def read_chunks(self, path, chunksize):
+        parquet_file = _pyarrow().parquet.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+
+    def count_rows(self, path):
+        return _pyarrow().parquet.ParquetFile(path).metadata.num_rows
+
+    def _read_existing(self, path):
+        # Existing row groups are copied over, then every spool chunk becomes a new row group.
+        existing = _pyarrow().parquet.ParquetFile(path)
+        return existing.schema_arrow, (existing.read_row_group(i) for i in range(existing.num_row_groups))
+
+    def _new_writer(self, path, schema):
+        return _pyarrow().parquet.ParquetWriter(path, schema)
+
+
+class ArrowFormat(ArrowTableFormat):
+    extensions = ('arrow', 'feather', 'ipc')
+
+    def _open(self, path):
+        pa = _pyarrow()
+        # Memory-mapped: record batches are read without copying the file into memory.
+        return pa.ipc.open_file(pa.memory_map(path, 'r'))
+
+    def read(self, path):
+        return self._open(path).read_all().to_pandas()
+
+    def read_chunks(self, path, chunksize):
+        reader = self._open(path)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            for start in range(0, batch.num_rows, chunksize):
+                yield batch.slice(start, chunksize).to_pandas()
+
+    def count_rows(self, path):
+        reader = self._open(path)
+        return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+    def _read_existing(self, path):
+        reader = self._open(path)
+        pa = _pyarrow()
+        return reader.schema, (pa.Table.from_batches([reader.get_batch(i)]) for i in range(reader.num_record_batches))
+
+    def _new_writer(self, path, schema):
+        return _pyarrow().ipc.new_file(path, schema)
+
+
+FORMATS = {}
+
+
+def register_format(file_format):
+    for extension in file_format.extensions:
+        FORMATS[extension] = file_format
+
+
+for _file_format in (CsvFormat(('csv',), ','), CsvFormat(('tsv',), '\t'), JsonlFormat(), ExcelFormat(), ParquetFormat(), ArrowFormat()):
+    register_format(_file_format)
+
+
+def get_format(extension):
+    if extension not in FORMATS:
+        supported = ", ".join(f"'{name}'" for name in sorted(FORMATS))
+        raise ValueError(f"Unsupported file format '{extension}'. Please use one of {supported}.")
+    return FORMATS[extension]
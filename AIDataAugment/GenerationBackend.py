@@ -0,0 +1,159 @@
+import random
+import re
+import threading
+import time
+import zlib
+
+
+BLOCKED_RESPONSE_MESSAGE = "Invalid operation: The `response.text` quick accessor requires the response to contain a valid `Part`, but none were returned. Please check the `candidate.safety_ratings` to determine if the response was blocked."
+
+
+class QuotaExceededError(Exception):
+    pass
+
+
+class GenerationBackend:
+    # A backend turns a prompt into response text. It raises ValueError for blocked or
+    # empty responses (retried by TextAugmentor) and QuotaExceededError when the quota
+    # is exhausted (backed off and retried).
+    model_name = None
+
+    def generate(self, prompt):
+        raise NotImplementedError
+
+    async def agenerate(self, prompt):
+        import asyncio
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self.generate, prompt)
+
+
+class GeminiBackend(GenerationBackend):
+    # google.generativeai is imported and the model built on the first request, so
+    # constructing a backend (and a TextAugmentor) stays cheap.
+    def __init__(self, api_key, model_name='gemini-1.5-flash', safety_settings=None):
+        self.model_name = model_name
+        self.api_key = api_key
+        self.safety_settings = safety_settings
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    import google.generativeai as genai
+                    genai.configure(api_key=self.api_key)
+                    self._model = genai.GenerativeModel(self.model_name, safety_settings=self.safety_settings)
+        return self._model
+
+    def _text(self, response):
+        if not response or not hasattr(response, 'text'):
+            raise ValueError(BLOCKED_RESPONSE_MESSAGE)
+        return response.text
+
+    def generate(self, prompt):
+        return self._text(self.model.generate_content(prompt))
+
+    async def agenerate(self, prompt):
+        return self._text(await self.model.generate_content_async(prompt))
+
+
+class MockBackend(GenerationBackend):
+    # Offline backend for load testing. It answers every `&&version_i&&`,
+    # `&&text_j_version_i&&` or `&&text_j_field_k_version_i&&` marker found in the prompt
+    # with a shuffled copy of the matching input text, sized like the placeholder asks. Outcomes are seeded by the
+    # prompt and the number of times it was seen, so runs are reproducible.
+    marker_pattern = re.compile(r"&&(?:text_(\d+)_)?(?:field_(\d+)_)?version_(\d+)&&")
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, quota_error_rate=0.0, blocked_rate=0.0, truncation_rate=0.0, duplicate_rate=0.0, seed=0, model_name='mock'):
+        self.model_name = model_name
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.quota_error_rate = quota_error_rate
+        self.blocked_rate = blocked_rate
+        self.truncation_rate = truncation_rate
+        self.duplicate_rate = duplicate_rate  # Versions answered with a verbatim copy of the input
+        self.seed = seed
+        self.calls = 0
+        self.prompt_chars = 0
+        self.response_chars = 0
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def _rng(self, prompt):
+        key = zlib.crc32(prompt.encode("utf-8"))
+        with self._lock:
+            count = self._seen.get(key, 0)
+            self._seen[key] = count + 1
+            self.calls += 1
+            self.prompt_chars += len(prompt)
+        return random.Random(f"{self.seed}:{key}:{count}")
+
+    def _delay(self, rng):
+        return max(0.0, self.latency + rng.uniform(-self.jitter, self.jitter))
+
+    def _source_texts(self, prompt):
+        sources = {}
+        for match in re.finditer(r"\bText (\d+)(?: field (\d+))? : (.*)$", prompt, re.MULTILINE):
+            sources[(match.group(1), match.group(2))] = match.group(3)
+        match = re.search(r"Input Text: (.*)$", prompt, re.MULTILINE)
+        if match:
+            sources[None] = match.group(1)
+        return sources
+
+    def _synthetic_text(self, rng, source, length):
+        words = source.split() or ["lorem", "ipsum", "dolor", "sit", "amet"]
+        out = []
+        size = 0
+        while size < length:
+            chunk = words[:]
+            rng.shuffle(chunk)
+            for word in chunk:
+                out.append(word)
+                size += len(word) + 1
+                if size >= length:
+                    break
+        return " ".join(out)
+
+    def _respond(self, prompt, rng):
+        if rng.random() < self.quota_error_rate:
+            raise QuotaExceededError("429 Resource has been exhausted (mock quota).")
+        if rng.random() < self.failure_rate:
+            raise ValueError("Mock backend failure.")
+        if rng.random() < self.blocked_rate:
+            raise ValueError(BLOCKED_RESPONSE_MESSAGE)
+
+        sources = self._source_texts(prompt)
+        parts = []
+        seen = set()
+        for line in prompt.splitlines():
+            for match in self.marker_pattern.finditer(line):
+                marker = match.group(0)
+                if marker in seen:
+                    continue
+                seen.add(marker)
+                size = re.search(r"in the range of (\d+) characters", line)
+                length = int(size.group(1)) if size else 80
+                source = sources.get((match.group(1), match.group(2)), sources.get(None, ""))
+                text = source if source and rng.random() < self.duplicate_rate else self._synthetic_text(rng, source, length)
+                parts.append(f"{marker} {text}")
+
+        response = "\n".join(parts)
+        if response and rng.random() < self.truncation_rate:
+            response = response[:rng.randint(len(response) // 2, len(response))]
+        with self._lock:
+            self.response_chars += len(response)
+        return response
+
+    def generate(self, prompt):
+        rng = self._rng(prompt)
+        time.sleep(self._delay(rng))
+        return self._respond(prompt, rng)
+
+    async def agenerate(self, prompt):
+        import asyncio
+        rng = self._rng(prompt)
+        await asyncio.sleep(self._delay(rng))
+        return self._respond(prompt, rng)
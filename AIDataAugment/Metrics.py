@@ -0,0 +1,177 @@
+import bisect
+import json
+import os
+import threading
+import time
+
+
+class Histogram:
+    # Cumulative-bucket histogram in the Prometheus layout.
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": {("+Inf" if bound == float("inf") else repr(bound)): total for bound, total in self.cumulative()},
+        }
+
+
+class AugmentMetrics:
+    # Hook for TextAugmentor.add_hook that aggregates the events of a run into counters and
+    # histograms. Export them with snapshot()/write_json() or to_prometheus()/write_prometheus()
+    # (text exposition format, e.g. for the node_exporter textfile collector).
+    LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0)
+    WRITE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+    FAILURE_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+    def __init__(self, prefix="aidataaugment"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.retries = {}
+        self.counters = {
+            "prompt_chars": 0,
+            "response_chars": 0,
+            "prompt_tokens": 0,
+            "response_tokens": 0,
+            "rate_limit_wait_seconds": 0.0,
+            "batches": 0,
+            "versions_requested": 0,
+            "versions_missing": 0,
+            "versions_lost": 0,
+            "versions_near_duplicate": 0,
+            "followup_requests": 0,
+            "source_rows": 0,
+            "output_rows": 0,
+            "rows_written": 0,
+            "bytes_written": 0,
+        }
+        self.request_latency = Histogram(self.LATENCY_BUCKETS)
+        self.write_latency = Histogram(self.WRITE_BUCKETS)
+        self.extraction_failures = Histogram(self.FAILURE_BUCKETS)
+        self.started = None
+        self.finished = None
+
+    def __call__(self, event, data):
+        with self._lock:
+            handler = getattr(self, "_on_" + event, None)
+            if handler is not None:
+                handler(data)
+
+    def _on_run_start(self, data):
+        self.started = data["time"]
+        self.finished = None
+
+    def _on_run_end(self, data):
+        self.finished = data["time"]
+
+    def _on_request(self, data):
+        self.requests[data["outcome"]] = self.requests.get(data["outcome"], 0) + 1
+        self.request_latency.observe(data["latency"])
+        self.counters["rate_limit_wait_seconds"] += data["wait"]
+        self.counters["prompt_chars"] += data["prompt_chars"]
+        self.counters["response_chars"] += data["response_chars"]
+        self.counters["prompt_tokens"] += data["prompt_tokens"]
+        self.counters["response_tokens"] += data["response_tokens"]
+
+    def _on_retry(self, data):
+        self.retries[data["reason"]] = self.retries.get(data["reason"], 0) + 1
+
+    def _on_extraction(self, data):
+        self.counters["batches"] += 1
+        self.counters["versions_requested"] += data["requested"]
+        self.counters["versions_missing"] += data["missing"]
+        self.counters["versions_lost"] += data["lost"]
+        self.counters["followup_requests"] += data["followups"]
+        self.counters["versions_near_duplicate"] += data.get("duplicates", 0)
+        self.extraction_failures.observe(data["missing"])
+
+    def _on_rows(self, data):
+        self.counters["source_rows"] += data["source_rows"]
+        self.counters["output_rows"] += data["output_rows"]
+
+    def _on_write(self, data):
+        self.counters["rows_written"] += data["rows"]
+        self.counters["bytes_written"] += data["bytes"]
+        self.write_latency.observe(data["latency"])
+
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+    def rows_per_second(self):
+        elapsed = self.elapsed()
+        return self.counters["source_rows"] / elapsed if elapsed > 0 else 0.0
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "elapsed_seconds": self.elapsed(),
+                "rows_per_second": self.rows_per_second(),
+                "requests": dict(self.requests),
+                "retries": dict(self.retries),
+                "counters": dict(self.counters),
+                "request_latency_seconds": self.request_latency.snapshot(),
+                "write_latency_seconds": self.write_latency.snapshot(),
+                "extraction_failures_per_batch": self.extraction_failures.snapshot(),
+            }
+
+    def to_prometheus(self):
+        snapshot = self.snapshot()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            name = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                label_text = "{" + ",".join(f'{key}="{label}"' for key, label in labels.items()) + "}" if labels else ""
+                lines.append(f"{name}{suffix}{label_text} {value}")
+
+        def histogram(name, help_text, values):
+            samples = [("_bucket", {"le": bound}, total) for bound, total in values["buckets"].items()]
+            samples += [("_sum", {}, values["sum"]), ("_count", {}, values["count"])]
+            metric(name, "histogram", help_text, samples)
+
+        metric("requests_total", "counter", "API requests by outcome.",
+               [("", {"outcome": outcome}, count) for outcome, count in sorted(snapshot["requests"].items())])
+        metric("retries_total", "counter", "Retried API requests by reason.",
+               [("", {"reason": reason}, count) for reason, count in sorted(snapshot["retries"].items())])
+        histogram("request_latency_seconds", "API request latency.", snapshot["request_latency_seconds"])
+        histogram("write_latency_seconds", "Output flush latency.", snapshot["write_latency_seconds"])
+        histogram("extraction_failures_per_batch", "Versions missing from a response before follow-ups.", snapshot["extraction_failures_per_batch"])
+        for name, value in snapshot["counters"].items():
+            metric(name + "_total", "counter", name.replace("_", " ").capitalize() + ".", [("", {}, value)])
+        metric("rows_per_second", "gauge", "Source rows processed per second.", [("", {}, snapshot["rows_per_second"])])
+        metric("elapsed_seconds", "gauge", "Seconds since the run started.", [("", {}, snapshot["elapsed_seconds"])])
+        return "\n".join(lines) + "\n"
+
+    def _write(self, path, text):
+        # Written to a temporary file first so a scraper never reads a partial file.
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as output:
+            output.write(text)
+        os.replace(tmp_path, path)
+
+    def write_prometheus(self, path):
+        self._write(path, self.to_prometheus())
+
+    def write_json(self, path):
+        self._write(path, json.dumps(self.snapshot(), indent=2))
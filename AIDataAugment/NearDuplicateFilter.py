@@ -0,0 +1,185 @@
+import threading
+import numpy as np
+
+
+class NearDuplicateFilter:
+    # Drops generated versions that are near-duplicates of their input text or of another
+    # version of the same row, and optionally of any version kept earlier in the run.
+    #
+    # Texts are compared through MinHash signatures over character n-grams, computed for a
+    # whole batch at once in NumPy. Within a row every version is compared to the input and
+    # to the other versions (an array of signature agreements, no Python pair loops). Across
+    # the output, signatures are split into LSH bands; a version sharing a band with a kept
+    # one is compared to it and dropped above the threshold. Band hashes are kept in a few
+    # sorted arrays that are merged as they grow, so lookups stay logarithmic on millions of
+    # rows, and kept signatures are stored as 16-bit minhashes (2 bytes per permutation).
+    #
+    # With replace=True, dropped versions are re-requested through the follow-up prompt used
+    # for missing versions (TextAugmentor.max_followups); otherwise they are just dropped.
+    def __init__(self, threshold=0.8, ngram=5, num_perm=64, bands=None, across_output=False, replace=True, seed=0):
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold must be in (0, 1].")
+        self.threshold = threshold
+        self.ngram = ngram
+        self.num_perm = num_perm
+        self.bands = bands or self._choose_bands(threshold, num_perm)
+        if num_perm % self.bands:
+            raise ValueError("num_perm must be a multiple of bands.")
+        self.across_output = across_output
+        self.replace = replace
+        rng = np.random.RandomState(seed)
+        self._multipliers = rng.randint(1, 2 ** 31, size=num_perm).astype(np.uint32) * np.uint32(2) + np.uint32(1)
+        self._offsets = rng.randint(0, 2 ** 31, size=num_perm).astype(np.uint32)
+        self._powers = np.uint64(1000003) ** np.arange(ngram - 1, -1, -1, dtype=np.uint64)
+        self._seen = []  # (sorted band hashes, signature ids) levels, sizes roughly halving
+        self._kept = np.empty((1024, num_perm), dtype=np.uint16)  # 16-bit signatures of kept versions
+        self._num_kept = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _choose_bands(threshold, num_perm):
+        # LSH collides at a similarity of about (1 / bands) ** (1 / rows); pick the split
+        # of num_perm whose collision point is closest to the threshold.
+        splits = [b for b in range(1, num_perm + 1) if num_perm % b == 0]
+        return min(splits, key=lambda b: abs((1 / b) ** (b / num_perm) - threshold))
+
+    def reset(self):
+        with self._lock:
+            self._seen = []
+            self._num_kept = 0
+
+    def signatures(self, texts, max_ngrams=1 << 18):
+        # Returns a (len(texts), num_perm) uint32 array; texts are hashed in blocks of at most
+        # max_ngrams n-grams to bound memory.
+        signatures = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        codes = [np.frombuffer(str(text).encode("utf-32-le"), dtype=np.uint32) for text in texts]
+        start = 0
+        while start < len(codes):
+            end = start
+            ngrams = 0
+            while end < len(codes) and (end == start or ngrams + len(codes[end]) <= max_ngrams):
+                ngrams += max(len(codes[end]) - self.ngram + 1, 1)
+                end += 1
+            signatures[start:end] = self._block_signatures(codes[start:end])
+            start = end
+        return signatures
+
+    def _block_signatures(self, codes):
+        n = self.ngram
+        # Texts shorter than one n-gram are zero padded to a single n-gram.
+        codes = [code if len(code) >= n else np.pad(code, (0, n - len(code))) for code in codes]
+        lengths = np.array([len(code) for code in codes], dtype=np.int64)
+        counts = lengths - n + 1
+        joined = np.concatenate(codes).astype(np.uint64)
+
+        # Polynomial hash of every window of the joined codes, keeping the windows that start
+        # and end inside one text.
+        windows = np.lib.stride_tricks.sliding_window_view(joined, n) @ self._powers
+        text_starts = np.cumsum(lengths) - lengths
+        gram_starts = np.cumsum(counts) - counts
+        positions = np.arange(counts.sum()) - np.repeat(gram_starts, counts) + np.repeat(text_starts, counts)
+        hashes = (self._mix(windows[positions]) >> np.uint64(32)).astype(np.uint32)
+
+        # One odd multiply-add per permutation (mod 2**32), the minimum per text is its minhash.
+        permuted = hashes[:, None] * self._multipliers + self._offsets
+        return np.minimum.reduceat(permuted, gram_starts, axis=0)
+
+    @staticmethod
+    def _mix(values):
+        # splitmix64 finalizer, spreads the polynomial hashes over all 64 bits.
+        values = values ^ (values >> np.uint64(30))
+        values = values * np.uint64(0xBF58476D1CE4E5B9)
+        values = values ^ (values >> np.uint64(27))
+        values = values * np.uint64(0x94D049BB133111EB)
+        return values ^ (values >> np.uint64(31))
+
+    def _band_hashes(self, signatures):
+        rows = self.num_perm // self.bands
+        bands = signatures.reshape(len(signatures), self.bands, rows).astype(np.uint64)
+        hashes = np.arange(self.bands, dtype=np.uint64)[None, :] + np.uint64(0x9E3779B97F4A7C15)
+        for k in range(rows):
+            hashes = self._mix(hashes ^ bands[:, :, k])
+        return hashes
+
+    def _similar_seen(self, hashes, signatures):
+        # For each row of band hashes, whether a kept version shares one of its bands and is
+        # similar enough to signatures (16-bit) once compared.
+        similar = np.zeros(len(hashes), dtype=bool)
+        for level_hashes, level_ids in self._seen:
+            for band in range(self.bands):
+                index = np.minimum(np.searchsorted(level_hashes, hashes[:, band]), len(level_hashes) - 1)
+                rows = np.flatnonzero((level_hashes[index] == hashes[:, band]) & ~similar)
+                if len(rows):
+                    kept = self._kept[level_ids[index[rows]]]
+                    similar[rows] = (kept == signatures[rows]).mean(axis=1) >= self.threshold
+        return similar
+
+    def _similar_earlier(self, hashes, signatures):
+        # Same check within a batch, against the first earlier row sharing each band.
+        similar = np.zeros(len(hashes), dtype=bool)
+        for band in range(self.bands):
+            _, first, inverse = np.unique(hashes[:, band], return_index=True, return_inverse=True)
+            earlier = first[inverse.ravel()]
+            rows = np.flatnonzero((earlier < np.arange(len(hashes))) & ~similar)
+            if len(rows):
+                similar[rows] = (signatures[earlier[rows]] == signatures[rows]).mean(axis=1) >= self.threshold
+        return similar
+
+    def _add_seen(self, hashes, signatures):
+        if not len(hashes):
+            return
+        while self._num_kept + len(signatures) > len(self._kept):
+            self._kept = np.concatenate([self._kept, np.empty_like(self._kept)])
+        ids = np.arange(self._num_kept, self._num_kept + len(signatures))
+        self._kept[ids] = signatures
+        self._num_kept += len(signatures)
+
+        level_hashes = hashes.ravel()
+        level_ids = np.repeat(ids, self.bands)
+        while self._seen and len(self._seen[-1][0]) <= 2 * len(level_hashes):
+            previous_hashes, previous_ids = self._seen.pop()
+            level_hashes = np.concatenate([previous_hashes, level_hashes])
+            level_ids = np.concatenate([previous_ids, level_ids])
+        order = np.argsort(level_hashes, kind="stable")
+        self._seen.append((level_hashes[order], level_ids[order]))
+
+    def select(self, sources, versions, fresh):
+        # sources: one input text per row. versions: per row, a list of version texts (None
+        # for a missing slot), all of the same length. fresh: per row, which slots were just
+        # generated. Returns a (rows, versions) boolean array of the slots to keep; versions
+        # that are not fresh are never dropped, only compared against.
+        rows = len(sources)
+        width = len(versions[0]) if rows else 0
+        present = np.array([[version is not None for version in row] for row in versions], dtype=bool).reshape(rows, width)
+        fresh = np.asarray(fresh, dtype=bool).reshape(rows, width) & present
+        keep = present & ~fresh
+        if not fresh.any():
+            return keep
+
+        texts = list(sources) + [version or "" for row in versions for version in row]
+        signatures = self.signatures(texts)
+        source_signatures = signatures[:rows]
+        version_signatures = signatures[rows:].reshape(rows, width, self.num_perm)
+
+        to_source = (version_signatures == source_signatures[:, None, :]).mean(axis=2) >= self.threshold
+        to_version = (version_signatures[:, :, None, :] == version_signatures[:, None, :, :]).mean(axis=3) >= self.threshold
+
+        # Greedy over the version index, vectorized over rows: a fresh version survives if it
+        # is not a copy of the input or of a version kept so far.
+        for i in range(width):
+            duplicate = to_source[:, i] | (to_version[:, i, :] & keep).any(axis=1)
+            keep[:, i] |= fresh[:, i] & ~duplicate
+
+        if self.across_output:
+            candidates = np.flatnonzero((keep & fresh).ravel())
+            candidate_signatures = version_signatures.reshape(rows * width, self.num_perm)[candidates]
+            hashes = self._band_hashes(candidate_signatures)
+            short = candidate_signatures.astype(np.uint16)
+            with self._lock:
+                duplicate = self._similar_seen(hashes, short) | self._similar_earlier(hashes, short)
+                self._add_seen(hashes[~duplicate], short[~duplicate])
+            flat = keep.ravel()
+            flat[candidates[duplicate]] = False
+            keep = flat.reshape(rows, width)
+
+        return keep
@@ -0,0 +1,53 @@
+from array import array
+from .FileFormats import _pandas
+
+
+class OutputBuilder:
+    # Collects generated rows as (source position, generated texts) in compact arrays
+    # instead of one dict copy of the source row per version. materialize() builds the
+    # DataFrame once: the source rows are taken from their frame with a vectorized take
+    # (one copy per generated row, in the frame's own dtypes) and the augmented columns
+    # are replaced by the generated texts.
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self._segments = []  # [frame, positions array, one text list per column]
+        self._rows = 0
+
+    def __len__(self):
+        return self._rows
+
+    def add(self, frame, groups):
+        # groups is a list of (source positions, versions): every source position gets
+        # every version, a version being a tuple of texts aligned with columns.
+        if not self._segments or self._segments[-1][0] is not frame:
+            self._segments.append([frame, array('q'), [[] for _ in self.columns]])
+        _, positions, texts = self._segments[-1]
+
+        for source_positions, versions in groups:
+            if not versions:
+                continue
+            for position in source_positions:
+                positions.extend([position] * len(versions))
+            for k, column_texts in enumerate(texts):
+                column_texts.extend([version[k] for version in versions] * len(source_positions))
+            self._rows += len(source_positions) * len(versions)
+
+    def materialize(self):
+        pd = _pandas()
+        parts = []
+
+        for frame, positions, texts in self._segments:
+            if not positions:
+                continue
+            part = frame.take(frame.index.get_indexer(positions))
+            for column, column_texts in zip(self.columns, texts):
+                part[column] = column_texts
+            parts.append(part)
+
+        if not parts:
+            return pd.DataFrame()
+        return pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0].reset_index(drop=True)
+
+    def clear(self):
+        self._segments = []
+        self._rows = 0
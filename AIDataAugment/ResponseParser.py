@@ -0,0 +1,26 @@
+import re
+
+
+# Matches `&&version_i&&` (single text prompts), `&&text_j_version_i&&` (batch prompts)
+# and `&&text_j_field_k_version_i&&` (rows with several augmented columns).
+MARKER_PATTERN = re.compile(r"&&(?:text_(\d+)_)?(?:field_(\d+)_)?version_(\d+)&&")
+
+
+def parse_versions(response):
+    # Splits the response on every marker in a single pass and returns
+    # {(text index, field index, version index): text}. Missing text or field numbers
+    # (single text or single column prompts) map to index 1.
+    # When the model repeats a marker, the first non-empty text is kept.
+    versions = {}
+    matches = list(MARKER_PATTERN.finditer(response))
+
+    for k, match in enumerate(matches):
+        end = matches[k + 1].start() if k + 1 < len(matches) else len(response)
+        text = response[match.end():end].strip()
+        key = (int(match.group(1) or 1), int(match.group(2) or 1), int(match.group(3)))
+        if text and not versions.get(key):
+            versions[key] = text
+        else:
+            versions.setdefault(key, text)
+
+    return versions
@@ -0,0 +1,117 @@
+import argparse
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from .FileFormats import get_format, _pandas
+from .TextAugmentor import TextAugmentor, SOURCE_ROW_COLUMN
+
+_worker_api_key = None
+
+
+def shard_filename(output_filename, shard_index, num_shards):
+    # out.csv -> out.shard-00002-of-00008.csv
+    stem, extension = os.path.splitext(output_filename)
+    return f"{stem}.shard-{shard_index:05d}-of-{num_shards:05d}{extension}"
+
+
+def merge_shards(output_filename, num_shards, remove_shards=False):
+    # Combines the shard outputs of output_filename into it, in source row order. Versions
+    # of the same source row stay in the order they were generated.
+    file_format = get_format(output_filename.split('.')[-1].lower())
+    # A shard that finished without output rows (more shards than rows, or only empty texts)
+    # has a journal but no output file; one that stopped early may still hold a spool.
+    paths = [shard_filename(output_filename, shard_index, num_shards) for shard_index in range(num_shards)]
+    missing = [
+        path for path in paths
+        if not os.path.exists(path) and (not os.path.exists(path + ".journal") or os.path.exists(path + file_format.spool_suffix))
+    ]
+    if missing:
+        raise FileNotFoundError(f"Missing shard outputs: {', '.join(missing)}")
+
+    frames = [file_format.read(path) for path in paths if os.path.exists(path)]
+    rows = 0
+    if frames:
+        merged = _pandas().concat(frames, ignore_index=True)
+        merged.sort_values(by=SOURCE_ROW_COLUMN, inplace=True, kind='stable')
+        file_format.write(output_filename, merged.drop(columns=[SOURCE_ROW_COLUMN]))
+        rows = len(merged)
+
+    if remove_shards:
+        for path in paths:
+            for shard_file in (path, path + ".journal"):
+                if os.path.exists(shard_file):
+                    os.remove(shard_file)
+    return rows
+
+
+def _init_worker(api_keys):
+    # Each worker process takes one key from the pool and keeps it for its lifetime.
+    global _worker_api_key
+    _worker_api_key = api_keys.get()
+
+
+def _run_shard(shard_index, num_shards, backend_factory, augmentor_kwargs, augment_kwargs):
+    if backend_factory is not None:
+        augmentor_kwargs = dict(augmentor_kwargs, backend=backend_factory(_worker_api_key))
+    augmentor = TextAugmentor(api_key=_worker_api_key, **augmentor_kwargs)
+    output_filename = shard_filename(augment_kwargs.pop("output_filename"), shard_index, num_shards)
+    augmentor.augment(output_filename=output_filename, shard_index=shard_index, num_shards=num_shards, **augment_kwargs)
+    return shard_index, output_filename
+
+
+class ShardRunner:
+    # Spreads one augmentation job over a pool of processes. Source rows are hash partitioned
+    # into num_shards shards; every worker process holds one API key from api_keys and writes
+    # each shard it runs to its own output file and journal, so rerunning resumes every shard
+    # where it stopped. merge() combines the shard outputs in source row order.
+    # backend_factory(api_key), when given, builds each worker's backend; it must be picklable
+    # (a module level function), as must augmentor_kwargs.
+    def __init__(self, api_keys, num_shards=None, backend_factory=None, **augmentor_kwargs):
+        if not api_keys:
+            raise ValueError("api_keys must contain at least one key.")
+        self.api_keys = list(api_keys)
+        self.num_shards = num_shards or len(self.api_keys)
+        self.backend_factory = backend_factory
+        self.augmentor_kwargs = augmentor_kwargs
+
+    def run(self, output_filename, merge=True, **augment_kwargs):
+        # augment_kwargs are passed to TextAugmentor.augment (file_path, column_to_augment, ...).
+        get_format(output_filename.split('.')[-1].lower()).check_dependencies()  # Fail before starting any worker
+        outputs = {}
+        # The manager's server process is shut down even when a shard fails.
+        with multiprocessing.Manager() as manager:
+            api_keys = manager.Queue()
+            for api_key in self.api_keys:
+                api_keys.put(api_key)
+
+            with ProcessPoolExecutor(max_workers=len(self.api_keys), initializer=_init_worker, initargs=(api_keys,)) as executor:
+                futures = [
+                    executor.submit(_run_shard, shard_index, self.num_shards, self.backend_factory, self.augmentor_kwargs, dict(augment_kwargs, output_filename=output_filename))
+                    for shard_index in range(self.num_shards)
+                ]
+                for future in as_completed(futures):
+                    shard_index, shard_output = future.result()
+                    outputs[shard_index] = shard_output
+
+        if merge:
+            merge_shards(output_filename, self.num_shards)
+        return [outputs[shard_index] for shard_index in sorted(outputs)]
+
+    def merge(self, output_filename, remove_shards=False):
+        return merge_shards(output_filename, self.num_shards, remove_shards=remove_shards)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge sharded augmentation outputs into one file in source row order.")
+    parser.add_argument("command", choices=["merge"])
+    parser.add_argument("output_filename", help="Output filename the shards were written for, e.g. out.csv")
+    parser.add_argument("--num-shards", type=int, required=True)
+    parser.add_argument("--remove-shards", action="store_true", help="Delete the shard files and journals after merging")
+    args = parser.parse_args(argv)
+
+    rows = merge_shards(args.output_filename, args.num_shards, remove_shards=args.remove_shards)
+    print(f"Merged {rows} rows from {args.num_shards} shards into {args.output_filename}")
+
+
+if __name__ == "__main__":
+    main()
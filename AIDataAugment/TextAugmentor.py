@@ -1,27 +1,54 @@
+import math
 import re
 import sys
-import time
 import threading
-import google.generativeai as genai
-import pandas as pd
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import json
 import logging
 import os
+from .RateLimiter import RateLimiter
+from .CheckpointWriter import CheckpointWriter
+from .GenerationBackend import GeminiBackend, QuotaExceededError, BLOCKED_RESPONSE_MESSAGE
+from .ResponseCache import ResponseCache
+from .BatchPlanner import BatchPlanner
+from .ResponseParser import parse_versions
+from .FileFormats import get_format, _pandas
+from .OutputBuilder import OutputBuilder
+from .TextSegmenter import split_text, join_segments
+
+SOURCE_ROW_COLUMN = "_source_row"  # Source row number carried by sharded outputs, used to merge them
 
 class TextAugmentor:
-    def __init__(self, api_key):
+    def __init__(self, api_key=None, requests_per_minute=15, tokens_per_minute=None, backend=None, cache_path=None, cache_max_bytes=256 * 1024 * 1024):
         self.max_char_limit = 20000
         self.max_char_input_limit = 50000
-        self.new_rows = []
+        self.max_output_tokens = 8192  # Output token limit of the model, the real cap on a batch
+        self.max_input_tokens = 1000000
+        self.chars_per_token = 4.0
+        self.plan_window = 2000  # Rows packed together by the batch planner
+        self.max_followups = 1  # Compact re-requests for versions missing from a response
+        self.min_version_ratio = 0.3  # Versions shorter than this fraction of the input count as truncated
+        self.near_duplicate_filter = None  # Optional NearDuplicateFilter applied to every response
+        self.long_document_mode = True  # Split single texts too long for one prompt into segments
+        self.min_segment_chars = 1000  # Smallest segment a long document is split into
+        self.segment_concurrency = 4  # Segment prompts of one document sent at the same time
+        self.max_retries = 3
+        self.max_quota_retries = 5
+        self.backoff_base = 4.0
+        self.flush_every = 100  # Output rows buffered before an append to the output file
+        self.flush_interval = 5.0  # Seconds between appends, whichever comes first
+        self.fsync_every = 1  # fsync the output and journal every N flushes (0 disables)
+        self.checkpoint = None
+        self.output_builder = None
         self.column_to_augment = None
-        self.lock = threading.Lock()  # Initialize a lock for thread safety
-        self.output_df = pd.DataFrame()
-        # Set up logging
+        self.lock = threading.RLock()  # Re-entrant so nested saves from the same thread cannot deadlock
+        self.rate_limiter = RateLimiter(requests_per_minute=requests_per_minute, tokens_per_minute=tokens_per_minute)
+        self.output_df = None
+        self.hooks = []
         self.logger = logging.getLogger(__name__)
-        logging.basicConfig(level=logging.INFO)
-        
-        # Configure the API
-        genai.configure(api_key=api_key)
+
         self.safety_settings = [
             {"category": "HARM_CATEGORY_DANGEROUS", "threshold": "BLOCK_NONE"},
             {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
@@ -29,117 +56,473 @@ class TextAugmentor:
             {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
             {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
         ]
-        self.model = genai.GenerativeModel('gemini-1.5-flash', safety_settings=self.safety_settings)
+
+        # Configure the API, unless a backend (e.g. MockBackend) is given
+        if backend is None:
+            if api_key is None:
+                raise ValueError("Either api_key or backend must be provided.")
+            backend = GeminiBackend(api_key, safety_settings=self.safety_settings)
+        self.backend = backend
+        self.cache = ResponseCache(cache_path, max_bytes=cache_max_bytes) if cache_path else None
 
     def augment_string(self, text, num_augmentations,style = "standard",language="EN"):
         if not text.strip():
             raise Exception("The text is empty. Try with text that contains words.")
 
-        if len(text) > self.max_char_input_limit:
-            self.logger.error(f"Text length ({len(text)}) exceeds the maximum allowed character limit ({self.max_char_input_limit}).")
+        if self._too_long((text,)):
             return
         
         self.language = language
+        self.style = style
+        return [version[0] for version in self._generate_versions((text,), num_augmentations)]
+
+    def augment_strings(self, texts, num_augmentations, style="standard", language="EN", max_concurrency=1):
+        # Augments many independent strings, packed into shared prompts like the rows of a
+        # DataFrame. Returns one list of versions per input text, in input order; empty or
+        # too long texts get an empty list and identical texts are requested once.
+        self.style = style
+        self.language = language
+        results = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, int(max_concurrency))) as executor:
+            futures = [(keys, executor.submit(self._run_steps, steps)) for keys, steps in self._plan_strings(texts, num_augmentations)]
+            for keys, future in futures:
+                results.update(zip(keys, future.result()))
+
+        return [[version[0] for version in results.get(text, [])] for text in texts]
+
+    async def aaugment_strings(self, texts, num_augmentations, style="standard", language="EN", max_concurrency=8):
+        # Async augment_strings: prompts go through backend.agenerate, at most max_concurrency
+        # at a time, without blocking the event loop.
+        import asyncio
+        self.style = style
+        self.language = language
+        semaphore = asyncio.Semaphore(max(1, int(max_concurrency)))
+
+        async def run(steps):
+            async with semaphore:
+                return await self._arun_steps(steps)
+
+        jobs = self._plan_strings(texts, num_augmentations)
+        outputs = await asyncio.gather(*(run(steps) for _, steps in jobs))
+        results = {}
+        for (keys, _), versions in zip(jobs, outputs):
+            results.update(zip(keys, versions))
+
+        return [[version[0] for version in results.get(text, [])] for text in texts]
+
+    def _plan_strings(self, texts, num_augmentations):
+        # Returns (texts, steps) jobs; each job's steps return one version list per text.
+        unique = []
+        seen = set()
+        for text in texts:
+            if not isinstance(text, str):
+                raise TypeError(f"Expected a string, got {type(text).__name__}.")
+            if text in seen:
+                continue
+            seen.add(text)
+            if not text.strip():
+                self.logger.warning("Skipping an empty text.")
+            elif not self._too_long((text,)):
+                unique.append(text)
+
+        planner = self._make_planner(1)
+        jobs = []
+        for start in range(0, len(unique), self.plan_window):
+            window = unique[start:start + self.plan_window]
+            bins, oversized = planner.pack([len(text) for text in window], num_augmentations)
+
+            for i in oversized:
+                jobs.append(([window[i]], self._single_steps(self._versions_steps((window[i],), num_augmentations))))
+
+            for packed in bins:
+                keys = [window[i] for i in sorted(packed)]
+                jobs.append((keys, self._batch_steps([(text,) for text in keys], num_augmentations)))
+
+        return jobs
+
+    def _single_steps(self, steps):
+        # Wraps the versions of a single text as a one-text batch result.
+        versions = yield from steps
+        return [versions]
+
+    def add_hook(self, hook):
+        # hook(event, data) is called for "run_start", "run_end", "request", "retry",
+        # "extraction", "rows" and "write" events, possibly from worker threads.
+        # AugmentMetrics is a ready-made hook that aggregates them.
+        self.hooks.append(hook)
+        return hook
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    def _emit(self, event, **data):
+        for hook in self.hooks:
+            try:
+                hook(event, data)
+            except Exception as e:
+                self.logger.warning(f"Hook {hook!r} failed on {event}: {e}")
+
+    def _cache_key(self, fields, num_versions):
+        # Multi-field rows are cached on all their fields together.
+        text = fields[0] if len(fields) == 1 else "\x1f".join(fields)
+        return ResponseCache.make_key(text, self.style, self.language, self.backend.model_name, num_versions)
+
+    def _cache_get(self, fields, num_versions):
+        if self.cache is None:
+            return None
+        cached = self.cache.get(self._cache_key(fields, num_versions))
+        if cached is None:
+            return None
+        return [tuple(version) if isinstance(version, list) else (version,) for version in cached]
+
+    def _cache_put(self, fields, versions):
+        if self.cache is not None:
+            value = [version[0] for version in versions] if len(fields) == 1 else [list(version) for version in versions]
+            self.cache.put(self._cache_key(fields, len(versions)), value)
+
+    def _generate_versions(self, fields, total_augmentations):
+        return self._run_steps(self._versions_steps(fields, total_augmentations))
+
+    def _versions_steps(self, fields, total_augmentations):
+        # fields is a tuple of texts from one row; every version is a tuple aligned with it.
+        cached = self._cache_get(fields, total_augmentations)
+        if cached is not None:
+            return cached
+
+        if self._is_long_document(fields, total_augmentations):
+            augmented_texts = yield from self._long_document_steps(fields[0], total_augmentations)
+            if len(augmented_texts) == total_augmentations:
+                self._cache_put(fields, augmented_texts)
+            return augmented_texts
+
         augmented_texts = []
-        text_length = len(text)
+        text_length = sum(len(field) for field in fields)
         max_augmentations_per_prompt = self._calculate_max_augmentations_per_prompt(text_length)
-        remaining_augmentations = num_augmentations
-        self.style = style
+        remaining_augmentations = total_augmentations
 
         while remaining_augmentations > 0:
             num_augmentations = min(max_augmentations_per_prompt, remaining_augmentations)
-            prompt = self._build_prompt(text, text_length, num_augmentations)
-            response = self._generate_text(prompt)
-            attempt = 0
-
-            while (not response or len(response) < text_length * num_augmentations * 0.6) and attempt < 2:
-                prompt = self._build_prompt(response, text_length, num_augmentations, task="extend")
-                response = self._generate_text(prompt)
-                attempt += 1
-
-            if response:
-                texts = self._extract_versions(response, num_augmentations)
-                augmented_texts.extend(texts)
+            if len(fields) == 1:
+                prompt = self._build_prompt(fields[0], text_length, num_augmentations)
+            else:
+                prompt = self._build_slots_prompt({1: fields}, [(1, i) for i in range(1, num_augmentations + 1)])
+            response = yield prompt
+            versions = (yield from self._collect_steps({1: fields}, num_augmentations, response))[1]
+            augmented_texts.extend(version for version in versions if version is not None)
 
             remaining_augmentations -= num_augmentations
 
+        if len(augmented_texts) == total_augmentations:
+            self._cache_put(fields, augmented_texts)
         return augmented_texts
-    
+
+    def _batch_steps(self, fields_list, total_augmentations):
+        # Versions for several rows sharing one prompt; rows found in the cache are left out.
+        versions = [self._cache_get(fields, total_augmentations) for fields in fields_list]
+        missing = [i for i, cached in enumerate(versions) if cached is None]
+
+        if missing:
+            texts = {k + 1: fields_list[i] for k, i in enumerate(missing)}
+            prompt = self._build_slots_prompt(texts, [(j, i) for j in texts for i in range(1, total_augmentations + 1)])
+            response = yield prompt
+            collected = yield from self._collect_steps(texts, total_augmentations, response)
+
+            for k, i in enumerate(missing):
+                versions[i] = [version for version in collected[k + 1] if version is not None]
+                if len(versions[i]) == total_augmentations:
+                    self._cache_put(fields_list[i], versions[i])
+
+        return versions
+
+    def _too_long(self, fields):
+        # Texts over max_char_input_limit are skipped, unless long_document_mode can split them.
+        text_length = sum(len(field) for field in fields)
+        if text_length <= self.max_char_input_limit or (self.long_document_mode and len(fields) == 1):
+            return False
+        self.logger.error(f"Text length ({text_length}) exceeds the maximum allowed character limit ({self.max_char_input_limit}).")
+        return True
+
+    def _segment_chars(self, total_augmentations):
+        # Largest segment whose versions all fit in the output budget of one prompt.
+        planner = self._make_planner()
+        budget_chars = planner.output_token_budget * planner.chars_per_token / total_augmentations
+        return max(self.min_segment_chars, int((budget_chars - planner.marker_chars) / planner.output_ratio))
+
+    def _is_long_document(self, fields, total_augmentations):
+        # Single texts whose versions do not fit in one prompt are split when splitting helps.
+        if not self.long_document_mode or len(fields) != 1:
+            return False
+        planner = self._make_planner()
+        text_length = len(fields[0])
+        return (text_length > self._segment_chars(total_augmentations)
+                and planner.version_output_tokens(text_length) * total_augmentations > planner.output_token_budget)
+
+    def _plan_segments(self, text, total_augmentations):
+        # Returns (segments, separators, jobs): jobs are (segment indices, steps) with the
+        # segments packed into batch prompts like the rows of a DataFrame.
+        segments, separators = zip(*split_text(text, self._segment_chars(total_augmentations)))
+        bins, oversized = self._make_planner(1).pack([len(segment) for segment in segments], total_augmentations)
+        jobs = []
+        for packed in bins:
+            packed.sort()
+            jobs.append((packed, self._batch_steps([(segments[i],) for i in packed], total_augmentations)))
+        for i in oversized:
+            jobs.append(([i], self._single_steps(self._versions_steps((segments[i],), total_augmentations))))
+        return segments, separators, jobs
+
+    def _long_document_steps(self, text, total_augmentations):
+        # Rewrites a long text segment by segment: the segment prompts run side by side and
+        # version i of the document joins version i of every segment with the separators of
+        # the original. The document gets as many versions as its least complete segment.
+        segments, separators, jobs = self._plan_segments(text, total_augmentations)
+        results = yield from self._parallel_steps([steps for _, steps in jobs])
+
+        segment_versions = [None] * len(segments)
+        for (indices, _), versions in zip(jobs, results):
+            for i, segment_version in zip(indices, versions):
+                segment_versions[i] = segment_version
+
+        count = min(len(versions) for versions in segment_versions)
+        if count < total_augmentations:
+            self.logger.warning(f"Only {count} of {total_augmentations} versions of a {len(segments)} segment document are complete.")
+        return [
+            (join_segments([versions[n][0] for versions in segment_versions], separators),)
+            for n in range(count)
+        ]
+
+    def _parallel_steps(self, steps_list):
+        # Runs several steps generators side by side: each round yields the list of their
+        # pending prompts and sends every response back to its generator. Returns their
+        # results in order. The generators themselves must yield single prompts.
+        results = [None] * len(steps_list)
+        pending = {}
+        for k, steps in enumerate(steps_list):
+            try:
+                pending[k] = next(steps)
+            except StopIteration as stop:
+                results[k] = stop.value
+
+        while pending:
+            keys = list(pending)
+            responses = yield [pending[k] for k in keys]
+            for k, response in zip(keys, responses):
+                try:
+                    pending[k] = steps_list[k].send(response)
+                except StopIteration as stop:
+                    del pending[k]
+                    results[k] = stop.value
+
+        return results
+
+    def _run_steps(self, steps):
+        # Steps generators yield prompts and get the responses sent back, so the same
+        # prompt logic runs on threads here and on an event loop in _arun_steps. A list of
+        # prompts is sent concurrently and gets the list of responses back.
+        try:
+            prompt = next(steps)
+            while True:
+                response = self._generate_all(prompt) if isinstance(prompt, list) else self._generate_text(prompt)
+                prompt = steps.send(response)
+        except StopIteration as stop:
+            return stop.value
+
+    async def _arun_steps(self, steps):
+        try:
+            prompt = next(steps)
+            while True:
+                response = await self._agenerate_all(prompt) if isinstance(prompt, list) else await self._agenerate_text(prompt)
+                prompt = steps.send(response)
+        except StopIteration as stop:
+            return stop.value
+
+    def _generate_all(self, prompts):
+        # At most segment_concurrency of the prompts are in flight; the rate limiter is shared.
+        workers = min(len(prompts), max(1, int(self.segment_concurrency)))
+        if workers == 1:
+            return [self._generate_text(prompt) for prompt in prompts]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(self._generate_text, prompts))
+
+    async def _agenerate_all(self, prompts):
+        import asyncio
+        semaphore = asyncio.Semaphore(max(1, int(self.segment_concurrency)))
+
+        async def run(prompt):
+            async with semaphore:
+                return await self._agenerate_text(prompt)
+
+        return list(await asyncio.gather(*(run(prompt) for prompt in prompts)))
+
     def _extract_file_format(self, file_path):
         if '.' in file_path:
             return file_path.split('.')[-1].lower()
         else:
             raise ValueError("File path does not have a valid extension.")
         
-    def _resume_index(self , file_path):
+    def _resume_index(self , file_path, total_augmentations=1):
+        # The checkpoint journal records completed source rows, only its last line is read.
+        if self.checkpoint is not None and os.path.exists(self.checkpoint.journal_path):
+            return self.checkpoint.next_position
+        # Output written before the journal existed: count its rows instead.
         if os.path.exists(file_path):
-            file_format = self._extract_file_format(file_path)
-            if file_format == 'csv':
-                df = pd.read_csv(file_path)
-                return len(df)
-            elif file_format == 'tsv':
-                df = pd.read_csv(file_path, delimiter='\t')
-                return len(df)
-            elif file_format in ['xls', 'xlsx']:
-                df= pd.read_excel(file_path)
-                return len(df)
-            else:
-                raise ValueError("Unsupported file format. Please use 'csv', 'tsv', or 'xls/xlsx'.")
+            return get_format(self._extract_file_format(file_path)).count_rows(file_path) // total_augmentations
         else : 
             return 0
         
     def _load_data(self, file_path=None, dataframe=None):
         if dataframe is not None:
-            self.dataframe = dataframe
+            self.dataframe = dataframe.copy()
         elif file_path:
-            file_format = self._extract_file_format(file_path)
-            if file_format == 'csv':
-                self.dataframe = pd.read_csv(file_path)
-            elif file_format == 'tsv':
-                self.dataframe = pd.read_csv(file_path, delimiter='\t')
-            elif file_format in ['xls', 'xlsx']:
-                self.dataframe = pd.read_excel(file_path)
-            else:
-                raise ValueError("Unsupported file format. Please use 'csv', 'tsv', or 'xls/xlsx'.")
+            self.dataframe = get_format(self._extract_file_format(file_path)).read(file_path)
         else:
             raise ValueError("Either file_path or dataframe must be provided.")
 
+    def _load_frames(self, file_path=None, dataframe=None, chunksize=None):
+        # Returns (frames, total rows). Without chunksize the whole input is a single frame.
+        if chunksize is None:
+            self._load_data(file_path=file_path, dataframe=dataframe)
+            return [(0, self.dataframe)], len(self.dataframe)
+        return self._iter_frames(file_path=file_path, dataframe=dataframe, chunksize=chunksize), None
+
+    def _iter_frames(self, file_path=None, dataframe=None, chunksize=None):
+        # Yields (offset, chunk) so only one chunk of the input is in memory at a time.
+        if dataframe is not None:
+            chunks = (dataframe.iloc[start:start + chunksize].copy() for start in range(0, len(dataframe), chunksize))
+        else:
+            # Formats without an incremental reader (Excel) are read whole; only the processing is chunked.
+            chunks = get_format(self._extract_file_format(file_path)).read_chunks(file_path, chunksize)
+
+        offset = 0
+        for chunk in chunks:
+            yield offset, chunk.reset_index(drop=True)
+            offset += len(chunk)
+
+    def _shard_frames(self, frames, total_rows, shard_index, num_shards):
+        # Keeps the rows whose hashed source row number falls in this shard. The hash only
+        # depends on the row number, so every worker computes the same partition. Offsets are
+        # renumbered over the shard's own rows so its journal stays contiguous.
+        if num_shards == 1:
+            return frames, total_rows
+
+        import numpy as np
+        pd = _pandas()
+
+        def shard(frames):
+            local_offset = 0
+            for offset, frame in frames:
+                source_rows = np.arange(offset, offset + len(frame), dtype=np.uint64)
+                mask = pd.util.hash_array(source_rows) % np.uint64(num_shards) == shard_index
+                frame = frame[mask].copy()
+                frame[SOURCE_ROW_COLUMN] = source_rows[mask].astype(np.int64)
+                yield local_offset, frame.reset_index(drop=True)
+                local_offset += len(frame)
+
+        if isinstance(frames, list):
+            frames = list(shard(frames))
+            return frames, sum(len(frame) for _, frame in frames)
+        return shard(frames), None
+
+    def _is_quota_error(self, error):
+        # google.api_core raises ResourceExhausted (HTTP 429) when the quota is used up.
+        if isinstance(error, QuotaExceededError) or type(error).__name__ in ("ResourceExhausted", "TooManyRequests"):
+            return True
+        message = str(error).lower()
+        return "429" in message or "quota" in message or "rate limit" in message
+
+    def _estimate_tokens(self, text):
+        return len(text) // 4 + 1
+
+    def _failure_outcome(self, error):
+        if isinstance(error, ValueError):
+            return "blocked" if str(error) == BLOCKED_RESPONSE_MESSAGE else "error"
+        return "quota" if self._is_quota_error(error) else "error"
+
+    def _request_failed(self, error, outcome, attempt, quota_retries):
+        # Blocked or invalid responses are retried max_retries times, quota errors back off
+        # exponentially and anything else is raised. Returns (attempt, quota_retries, give_up).
+        if isinstance(error, ValueError):
+            attempt += 1
+            self.logger.error(f"Attempt {attempt} failed: {error}")
+            if attempt == self.max_retries:
+                self.logger.error(f"Continuing after {self.max_retries} failed attempts.")
+                return attempt, quota_retries, True
+        elif outcome != "quota" or quota_retries >= self.max_quota_retries:
+            raise error
+        else:
+            delay = self.backoff_base * (2 ** quota_retries)
+            quota_retries += 1
+            self.logger.warning(f"Quota exceeded, backing off for {delay:.1f}s: {error}")
+            self.rate_limiter.backoff(delay)
+        self._emit("retry", reason=outcome)
+        return attempt, quota_retries, False
+
+    def _emit_request(self, text, response, outcome, wait_start, start):
+        if self.hooks:
+            self._emit(
+                "request", outcome=outcome, latency=time.perf_counter() - start, wait=start - wait_start,
+                prompt_chars=len(text), response_chars=len(response or ""),
+                prompt_tokens=self._estimate_tokens(text), response_tokens=self._estimate_tokens(response) if response else 0,
+            )
+
     def _generate_text(self, text):
-        for attempt in range(3):
+        attempt = 0
+        quota_retries = 0
+        while attempt < self.max_retries:
+            wait_start = time.perf_counter()
+            self.rate_limiter.acquire(self._estimate_tokens(text))
+            start = time.perf_counter()
+            response = None
+            outcome = "error"
             try:
-                response = self.model.generate_content(text)
-                time.sleep(4)
-                if not response or not hasattr(response, 'text'):
-                    raise ValueError("Invalid operation: The `response.text` quick accessor requires the response to contain a valid `Part`, but none were returned. Please check the `candidate.safety_ratings` to determine if the response was blocked.")
-                return response.text
-            except ValueError as e:
-                self.logger.error(f"Attempt {attempt + 1} failed: {e}")
-                if attempt == 2:
-                    self.logger.error("Continuing after 3 failed attempts.")
+                response = self.backend.generate(text)
+                outcome = "ok" if response else "empty"
+                return response
+            except Exception as e:
+                outcome = self._failure_outcome(e)
+                attempt, quota_retries, give_up = self._request_failed(e, outcome, attempt, quota_retries)
+                if give_up:
                     return None
+            finally:
+                self._emit_request(text, response, outcome, wait_start, start)
+        return None
+
+    async def _agenerate_text(self, text):
+        # Same as _generate_text, awaiting the rate limiter and backend.agenerate.
+        attempt = 0
+        quota_retries = 0
+        while attempt < self.max_retries:
+            wait_start = time.perf_counter()
+            await self.rate_limiter.aacquire(self._estimate_tokens(text))
+            start = time.perf_counter()
+            response = None
+            outcome = "error"
+            try:
+                response = await self.backend.agenerate(text)
+                outcome = "ok" if response else "empty"
+                return response
+            except Exception as e:
+                outcome = self._failure_outcome(e)
+                attempt, quota_retries, give_up = self._request_failed(e, outcome, attempt, quota_retries)
+                if give_up:
+                    return None
+            finally:
+                self._emit_request(text, response, outcome, wait_start, start)
+        return None
+
+    def _build_prompt(self, text, char_count, num_versions):
+        output_format = "\n".join([
+            f"&&version_{i}&& [Generate a reformulated version of the input text that retains the key information but is expressed differently in the range of {char_count} characters.]"
+            for i in range(1, num_versions + 1)
+        ])
+        prompt = f'''
+        Task: Generate a {self.style} rephrased version of the input text, preserving the essential information while expressing it uniquely within approximately {char_count} characters. Ensure the output maintains the original text format without adding any extra titles or markdown.
+        language : {self.language}
+        Input Text: {text}
 
-    def _build_prompt(self, text, char_count, num_versions, task="generate"):
-        if task == "generate":
-            output_format = "\n".join([
-                f"&&version_{i}&& [Generate a reformulated version of the input text that retains the key information but is expressed differently in the range of {char_count} characters.]"
-                for i in range(1, num_versions + 1)
-            ])
-            prompt = f'''
-            Task: Generate a {self.style} rephrased version of the input text, preserving the essential information while expressing it uniquely within approximately {char_count} characters. Ensure the output maintains the original text format without adding any extra titles or markdown.
-            language : {self.language}
-            Input Text: {text}
-
-            Output Format:
-            {output_format}
-            '''
-        else:
-            prompt = f'''
-            Task: Extend the text for each &&version&& existing in the text input. The output format should match the original text, no extra titles or markdown.
-            language : {self.language}
-            Input Text: {text}
-
-            Output Format:
-            '''
+        Output Format:
+        {output_format}
+        '''
         return prompt.strip()
 
     def _sanitize_value(self, value, file_format):
@@ -158,243 +541,422 @@ class TextAugmentor:
             sanitized_value = str(value)  # Ensure value is a string
         return sanitized_value
 
-    def _extract_versions(self, prototype, num_versions):
-        texts = []
-
-        for i in range(1, num_versions + 1):
-            version_tag = f"&&version_{i}&&"
-            start_index = prototype.find(version_tag) + len(version_tag)
-            end_index = prototype.find(f"&&version_{i + 1}&&") if i < num_versions else len(prototype)
-            text = prototype[start_index:end_index].strip()
-            texts.append(text)
-
-        return texts
+    def _valid_version(self, version, source):
+        if not version:
+            return None
+        # An echoed placeholder or a cut-off text is as good as missing.
+        if version.startswith("[Generate a reformulated version") or len(version) < len(source) * self.min_version_ratio:
+            return None
+        return version
+
+    def _parsed_version(self, parsed, j, i, fields):
+        # A version is only usable when every field of the row came back valid.
+        version = tuple(self._valid_version(parsed.get((j, k, i)), field) for k, field in enumerate(fields, 1))
+        return version if all(version) else None
+
+    def _collect_steps(self, texts, num_versions, response):
+        # texts maps the prompt's text index to the tuple of field texts of a row. Returns the
+        # same keys mapped to num_versions slots; missing, empty or truncated slots are
+        # re-requested together in one compact prompt, and slots that still fail stay None.
+        # Near-duplicates dropped by near_duplicate_filter count as missing when it replaces them.
+        parsed = parse_versions(response) if response else {}
+        slots = {
+            j: [self._parsed_version(parsed, j, i, fields) for i in range(1, num_versions + 1)]
+            for j, fields in texts.items()
+        }
+        dedup = self.near_duplicate_filter
+        duplicates = 0
+        if dedup is not None and dedup.replace:
+            duplicates += self._drop_near_duplicates(texts, slots)
+
+        first_missing = None
+        followups = 0
+        for _ in range(self.max_followups):
+            missing = [(j, i + 1) for j, versions in slots.items() for i, version in enumerate(versions) if version is None]
+            if first_missing is None:
+                first_missing = len(missing)
+            if not missing:
+                break
+            followups += 1
+            prompt = self._build_slots_prompt({j: texts[j] for j in sorted({j for j, _ in missing})}, missing)
+            response = yield prompt
+            if not response:
+                continue
+            parsed = parse_versions(response)
+            for j, i in missing:
+                slots[j][i - 1] = self._parsed_version(parsed, j, i, texts[j])
+            if dedup is not None and dedup.replace:
+                duplicates += self._drop_near_duplicates(texts, slots, set(missing))
+
+        if dedup is not None and not dedup.replace:
+            duplicates += self._drop_near_duplicates(texts, slots)
+        lost = sum(version is None for versions in slots.values() for version in versions)
+        if first_missing is None:
+            first_missing = lost
+        self._emit("extraction", requested=len(texts) * num_versions, missing=first_missing, lost=lost, followups=followups, duplicates=duplicates)
+        if lost:
+            self.logger.warning(f"{lost} of {len(texts) * num_versions} versions could not be generated.")
+        return slots
+
+    def _drop_near_duplicates(self, texts, slots, fresh=None):
+        # Sets the fresh slots (all of them by default) that near_duplicate_filter rejects
+        # to None and returns how many were dropped. Fields of a row are compared joined.
+        keys = list(slots)
+        keep = self.near_duplicate_filter.select(
+            ["\n".join(texts[j]) for j in keys],
+            [["\n".join(version) if version is not None else None for version in slots[j]] for j in keys],
+            [[fresh is None or (j, i) in fresh for i in range(1, len(slots[j]) + 1)] for j in keys],
+        )
+        dropped = 0
+        for r, j in enumerate(keys):
+            for i, version in enumerate(slots[j]):
+                if version is not None and not keep[r, i]:
+                    slots[j][i] = None
+                    dropped += 1
+        return dropped
 
     def _calculate_max_augmentations_per_prompt(self, text_length):
-        max_augmentations = self.max_char_limit // text_length
-        return max(1, max_augmentations)
-
-    def _augment_text(self, text, row, column_to_augment, total_augmentations):
-        if not text.strip():
+        return self._make_planner().max_versions_per_prompt(text_length)
+
+    def _make_planner(self, num_fields=None):
+        # max_char_limit still caps the characters generated per prompt.
+        budget = min(self.max_output_tokens, self.max_char_limit / self.chars_per_token)
+        planner = BatchPlanner(budget, input_token_budget=self.max_input_tokens, chars_per_token=self.chars_per_token)
+        if num_fields is not None:
+            # Measure the instruction overhead of the real batch prompt.
+            empty = {1: ("",) * num_fields}
+            base = len(self._build_slots_prompt(empty, []))
+            planner.prompt_overhead_chars = len(self._build_slots_prompt({}, []))
+            planner.row_overhead_chars = base - planner.prompt_overhead_chars
+            planner.version_line_chars = len(self._build_slots_prompt(empty, [(1, 1)])) - base
+            planner.marker_chars *= num_fields
+        return planner
+
+    def _augment_text(self, fields, positions, total_augmentations):
+        if not any(field.strip() for field in fields):
             raise Exception("The text is empty. Try with text that contains words.")
-        if len(text) > self.max_char_input_limit:
-            self.logger.error(f"Text length ({len(text)}) exceeds the maximum allowed character limit ({self.max_char_input_limit}).")
-            return
-        
-        text_length = len(text)
-        max_augmentations_per_prompt = self._calculate_max_augmentations_per_prompt(text_length)
-        remaining_augmentations = total_augmentations
-
-        while remaining_augmentations > 0:
-            num_augmentations = min(max_augmentations_per_prompt, remaining_augmentations)
-            prompt = self._build_prompt(text, text_length, num_augmentations)
-            response = self._generate_text(prompt)
-            attempt = 0
-
-            while (not response or len(response) < text_length * num_augmentations * 0.6) and attempt < 2:
-                prompt = self._build_prompt(response, text_length, num_augmentations, task="extend")
-                response = self._generate_text(prompt)
-                attempt += 1
-
-            if response:
-                texts = self._extract_versions(response, num_augmentations)
-                with self.lock:  # Ensure thread-safe access to shared resources
-
-                    for augmented_text in texts:
-                        new_row = row.copy()
-                        new_row[column_to_augment] = augmented_text
-                        self.new_rows.append(new_row)
-                        self._save_intermediate() 
-
-            remaining_augmentations -= num_augmentations
-
-    def _build_batch_prompt(self, batch, column_to_augment, total_augmentations):
-        texts = "\n".join([
-            f'''Text {index+1} : {rowt[column_to_augment]}'''
-            for index, rowt in enumerate(batch)
-        ])
-        output = "\n".join([
-            f'''&&text_{index + 1}_version_{i+1}&& [Generate a reformulated version of the input text that retains the key information but is expressed differently in the range of {len(rowc[column_to_augment])} characters.]'''
-            for index, rowc in enumerate(batch)
-            for i in range(total_augmentations)
-        ])
+        if self._too_long(fields):
+            return []
+
+        return [(positions, self._generate_versions(fields, total_augmentations))]
+
+    def _build_slots_prompt(self, texts, slots):
+        # texts maps a text index to its field tuple; slots are (text index, version index)
+        # pairs, so a follow-up prompt can ask for just the versions that are missing while
+        # keeping the original markers. Rows with several fields get one marker per field.
+        if all(len(fields) == 1 for fields in texts.values()):
+            texts_block = "\n".join([
+                f'''Text {index} : {fields[0]}'''
+                for index, fields in texts.items()
+            ])
+            output = "\n".join([
+                f'''&&text_{index}_version_{i}&& [Generate a reformulated version of the input text that retains the key information but is expressed differently in the range of {len(texts[index][0])} characters.]'''
+                for index, i in slots
+            ])
+        else:
+            texts_block = "\n".join([
+                f'''Text {index} field {k} : {field}'''
+                for index, fields in texts.items()
+                for k, field in enumerate(fields, 1)
+            ])
+            output = "\n".join([
+                f'''&&text_{index}_field_{k}_version_{i}&& [Generate a reformulated version of field {k} of the input text, consistent with the other fields of the same version, that retains the key information but is expressed differently in the range of {len(field)} characters.]'''
+                for index, i in slots
+                for k, field in enumerate(texts[index], 1)
+            ])
         prompt = f'''
         Task: for each Text in the input texts, generate a {self.style} rephrased version of the input texts, preserving the essential information while expressing it uniquely. Ensure the output maintains the original text format without adding any extra titles or markdown .
         Language: {self.language}
-        Input Texts: {texts}
+        Input Texts: {texts_block}
 
         Output Format:
         {output}
         '''
         return prompt
-    
-    def __extract_versions_large(self, response, total_augmentations, batch):
-        M = []
-
-        for j in range(1, len(batch) + 1):
-            texts = []
-
-            for i in range(1, total_augmentations + 1):
-                version_tag = f"&&text_{j}_version_{i}&&"
-                next_version_tag = f"&&text_{j}_version_{i+1}&&"
-                next_batch_tag = f"&&text_{j+1}_version_{1}&&"
-
-                if version_tag in response:
-                    start_index = response.find(version_tag) + len(version_tag)
-                    if i < total_augmentations and next_version_tag in response:
-                        end_index = response.find(next_version_tag)
-                    elif i >= total_augmentations and j < len(batch) and next_batch_tag in response:
-                        end_index = response.find(next_batch_tag)
-                    else:
-                        end_index = len(response)
-                    text = response[start_index:end_index].strip()
-                    texts.append(text)
-                else:
-                    texts.append(" ")
-
-            M.append(texts)
-
-        return M
    
-    def _process_batch(self, batch, column_to_augment, total_augmentations):
-        prompt = self._build_batch_prompt(batch, column_to_augment, total_augmentations)
-        response = self._generate_text(prompt)
-
-        if response:
-            M = self.__extract_versions_large(response, total_augmentations, batch)
-
-            for i, rowN in enumerate(batch):
+    def _process_batch(self, entries, total_augmentations):
+        # entries are (source positions, field texts); identical texts from the same run share
+        # one entry, so all of its positions get its versions.
+        versions = self._run_steps(self._batch_steps([fields for _, fields in entries], total_augmentations))
+        return [(positions, versions[i]) for i, (positions, _) in enumerate(entries)]
+
+    def _commit(self, positions, frame, groups, total_rows=None, stream=False):
+        # Called from the submitting thread only, in submission order, so output order is preserved.
+        # Returns the new output rows when they leave output_builder right away (see _save_intermediate).
+        output_rows = sum(len(source_positions) * len(versions) for source_positions, versions in groups)
+        with self.lock:
+            self.output_builder.add(frame, groups)
+            new_rows = self._save_intermediate(positions, stream)
+        self.rows_done += len(positions)
+        self._emit("rows", source_rows=len(positions), output_rows=output_rows)
+        progress = f"{self.rows_done} / {total_rows}" if total_rows is not None else f"{self.rows_done}"
+        sys.stdout.write(f"\r{progress} rows processed. wait ")
+        sys.stdout.flush()
+        return new_rows
+
+    def _iter_windows(self, frame, columns):
+        # Yields (entries, skipped positions) for windows of at most plan_window distinct texts.
+        # An entry is [positions, field texts]; rows are sorted so identical texts are adjacent
+        # and the positions of repeats are added to the first one.
+        window = []
+        skipped = []
+        last_text = None
+        texts = [frame[column].where(frame[column].notna(), "").astype(str).tolist() for column in columns]
+
+        for gindex, text in zip(frame.index.tolist(), zip(*texts)):
+
+            if self.checkpoint is not None and self.checkpoint.is_complete(gindex):
+                continue
 
-                for j in range(total_augmentations):
-                    new_row = rowN.copy()
-                    new_row[column_to_augment] = M[i][j]
-                    self.new_rows.append(new_row)
-                    self._save_intermediate() 
-                    
-    def _process_data(self, column_to_augment, total_augmentations, style="standard", language="EN"):
+            empty = [column for column, field in zip(columns, text) if not field.strip()]
 
-        if not self.output_filename:
-            self.output_df = pd.DataFrame()
+            if empty:
+                self.logger.warning(f"Skipping row {gindex + 1} due to empty text in column '{empty[0]}'.")
+                skipped.append(gindex)
+                continue
 
-        if column_to_augment not in self.dataframe.columns:
-            raise ValueError(f"Column '{column_to_augment}' does not exist in the DataFrame.")
-        
+            if text == last_text and window:
+                window[-1][0].append(gindex)
+                continue
+            last_text = text
+
+            if len(window) >= self.plan_window:
+                yield window, skipped
+                window = []
+                skipped = []
+
+            window.append([[gindex], text])
+
+        if window or skipped:
+            yield window, skipped
+
+    def _plan_jobs(self, frames, columns, total_augmentations, planner):
+        # Yields (source positions, frame, job, args). Skipped rows ride along with the first
+        # job of their window so the checkpoint journal marks them complete too.
+        for frame in frames:
+
+            for window, skipped in self._iter_windows(frame, columns):
+                bins, oversized = planner.pack([sum(map(len, entry[1])) for entry in window], total_augmentations)
+
+                for i in oversized:
+                    positions, text = window[i]
+                    yield positions + skipped, frame, self._augment_text, (text, positions, total_augmentations)
+                    skipped = []
+
+                for packed in bins:
+                    packed.sort()  # Keep the prompt in source order
+                    entries = [(window[i][0], window[i][1]) for i in packed]
+                    positions = [position for i in packed for position in window[i][0]]
+                    yield positions + skipped, frame, self._process_batch, (entries, total_augmentations)
+                    skipped = []
+
+                if skipped:
+                    yield skipped, frame, list, ()
+
+    def _sort_frame(self, frame, offset, columns):
+        # Sort by (length, text) and index rows by their global processing position.
+        for column in columns:
+            if column not in frame.columns:
+                raise ValueError(f"Column '{column}' does not exist in the DataFrame.")
+
+        frame['_text_key'] = frame[columns].astype(str).agg("\x1f".join, axis=1) if len(columns) > 1 else frame[columns[0]].astype(str)
+        frame['text_length'] = frame['_text_key'].str.len()
+        frame.sort_values(by=['text_length', '_text_key'], inplace=True, kind='stable')
+        frame.reset_index(drop=True, inplace=True)
+        frame.index += offset
+        return frame.drop(columns=['text_length', '_text_key'])
+
+    def _sorted_frames(self, frames, columns):
+        for offset, frame in frames:
+            if self.checkpoint is not None and self.checkpoint.next_position >= offset + len(frame):
+                continue  # Chunk finished in an earlier run
+            yield self._sort_frame(frame, offset, columns)
+
+    def _open_checkpoint(self, total_augmentations, read_only=False):
+        self.checkpoint = None
+        if self.output_filename is None:
+            return 0
+        self.checkpoint = CheckpointWriter(self.output_filename, get_format(self._extract_file_format(self.output_filename)), flush_every=self.flush_every, flush_interval=self.flush_interval, fsync_every=self.fsync_every, on_flush=self._on_flush, read_only=read_only)
+        index = self._resume_index(self.output_filename, total_augmentations)
+        if not os.path.exists(self.checkpoint.journal_path):
+            self.checkpoint.add(None, range(index))
+            self.checkpoint.flush()
+        return index
+
+    def _on_flush(self, rows, bytes_written, seconds):
+        self._emit("write", rows=rows, bytes=bytes_written, latency=seconds)
+
+    def _long_document_calls(self, text, total_augmentations):
+        # First-pass calls of a long document: one per batch of segments, plus the calls of
+        # segments whose versions are still spread over several prompts.
+        segments = [segment for segment, _ in split_text(text, self._segment_chars(total_augmentations))]
+        bins, oversized = self._make_planner(1).pack([len(segment) for segment in segments], total_augmentations)
+        return len(bins) + sum(
+            math.ceil(total_augmentations / self._calculate_max_augmentations_per_prompt(len(segments[i]))) for i in oversized
+        )
+
+    def _plan_report(self, frames, columns, total_augmentations, style="standard", language="EN"):
+        # Dry run: plan every remaining row without calling the API or writing any file. The
+        # checkpoint is read-only, so a run writing to the same output is left alone.
         self.style = style
         self.language = language
-        total_rows = len(self.dataframe)
-        self.dataframe['text_length'] = self.dataframe[column_to_augment].apply(lambda x: len(str(x)))
-        self.dataframe.sort_values(by='text_length', inplace=True)
-        self.dataframe.reset_index(drop=True, inplace=True)
-        self.dataframe = self.dataframe.drop(columns='text_length')
-        batch = []
-        current_batch_char_count = 0
-        if self.output_filename is not None :
-            index = self._resume_index(self.output_filename) // total_augmentations
-        else :
-            index = 0
-        self.dataframe = self.dataframe.iloc[index:]
-
-        for gindex, row in self.dataframe.iterrows():
-
-            if column_to_augment not in row:
-                self.logger.warning(f"Skipping row {gindex + 1} due to missing column data.")
-                continue
+        self._open_checkpoint(total_augmentations, read_only=True)
+        planner = self._make_planner(len(columns))
+        report = {"rows": 0, "calls": 0, "batch_calls": 0, "single_row_calls": 0, "long_document_calls": 0, "estimated_input_tokens": 0, "estimated_output_tokens": 0}
+        filled = 0.0
+
+        for frame in self._sorted_frames(frames, columns):
+
+            for window, skipped in self._iter_windows(frame, columns):
+                window_report = planner.report([sum(map(len, entry[1])) for entry in window], total_augmentations)
+                report["rows"] += sum(len(entry[0]) for entry in window)
+                for key in ("calls", "batch_calls", "single_row_calls", "estimated_input_tokens", "estimated_output_tokens"):
+                    report[key] += window_report[key]
+
+                # Long documents are split instead of spreading their versions over single calls.
+                for _, fields in window:
+                    if self._is_long_document(fields, total_augmentations):
+                        single_calls = math.ceil(total_augmentations / planner.max_versions_per_prompt(len(fields[0])))
+                        long_calls = self._long_document_calls(fields[0], total_augmentations)
+                        report["single_row_calls"] -= single_calls
+                        report["long_document_calls"] += long_calls
+                        report["calls"] += long_calls - single_calls
+                filled += window_report["expected_fill_ratio"] * window_report["batch_calls"]
+
+        report["expected_fill_ratio"] = filled / report["batch_calls"] if report["batch_calls"] else 0.0
+        report["output_token_budget_per_call"] = planner.output_token_budget
+        self.checkpoint = None
+        return report
+
+    def _iter_results(self, frames, columns, total_augmentations, style="standard", language="EN", max_concurrency=1):
+        # Runs the jobs and yields (source positions, frame, (positions, versions) groups) in
+        # submission order.
+        self.style = style
+        self.language = language
+        self.rows_done = self._open_checkpoint(total_augmentations)
+        planner = self._make_planner(len(columns))
+        max_concurrency = max(1, int(max_concurrency))
+        self._emit("run_start", time=time.time(), resumed_rows=self.rows_done)
 
-            row = row.to_dict()
-            text = str(row[column_to_augment])
-            text_length = len(text)
+        # Keep up to max_concurrency prompts in flight; results are committed in submission order.
+        try:
+            with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+                pending = deque()
 
-            if not text.strip():
-                self.logger.warning(f"Skipping row {gindex + 1} due to empty text in column '{column_to_augment}'.")
-                continue
+                for positions, frame, job, args in self._plan_jobs(self._sorted_frames(frames, columns), columns, total_augmentations, planner):
+                    pending.append((positions, frame, executor.submit(job, *args)))
 
-            if text_length * total_augmentations >= self.max_char_limit:
-                self._augment_text(text, row, column_to_augment, total_augmentations)
-                continue
+                    if len(pending) >= max_concurrency:
+                        positions, frame, future = pending.popleft()
+                        yield positions, frame, future.result()
 
-            if current_batch_char_count + text_length <= self.max_char_limit / total_augmentations:
-                batch.append(row)
-                current_batch_char_count += text_length
-                
-            else:
-                self._process_batch(batch, column_to_augment, total_augmentations)
-                batch = [row]
-                current_batch_char_count = text_length
+                while pending:
+                    positions, frame, future = pending.popleft()
+                    yield positions, frame, future.result()
+        finally:
+            # Flush whatever completed, even on failure, so a rerun resumes after it.
+            if self.checkpoint is not None:
+                self.checkpoint.close()
+            self._emit("run_end", time=time.time(), rows=self.rows_done)
+
+    def _process_data(self, column_to_augment, total_augmentations, style="standard", language="EN", max_concurrency=1, frames=None, total_rows=None):
+        columns = column_to_augment if isinstance(column_to_augment, list) else [column_to_augment]
+
+        self.output_builder = OutputBuilder(columns)
 
-            sys.stdout.write(f"\r{gindex + 1} / {total_rows} rows processed. wait ")
-            sys.stdout.flush()
+        if frames is None:
+            frames = [(0, self.dataframe)]
+            total_rows = len(self.dataframe)
 
-        if batch:
-            self._process_batch(batch, column_to_augment, total_augmentations)
+        for positions, frame, groups in self._iter_results(frames, columns, total_augmentations, style, language, max_concurrency):
+            self._commit(positions, frame, groups, total_rows)
 
-    def _save_intermediate(self):
+        if not self.output_filename:
+            # Built once from the recorded (source row, text) pairs instead of growing a DataFrame.
+            self.output_df = self.output_builder.materialize()
+            self.output_builder.clear()
+
+    def _save_intermediate(self, positions=(), stream=False):
         with self.lock:  # Ensure thread-safe access to shared resources
 
-            if self.output_filename :
-                file_format = self._extract_file_format(self.output_filename)
-                df_new_rows = pd.DataFrame(self.new_rows)
-                
-                if file_format == 'csv':
-
-                    if os.path.exists(self.output_filename):
-                        df_existing = pd.read_csv(self.output_filename)
-                        df_combined = pd.concat([df_existing, df_new_rows], ignore_index=True)
-                    else:
-                        df_combined = df_new_rows
-                    df_combined.to_csv(self.output_filename, index=False)
-                
-                elif file_format == 'tsv':
-
-                    if os.path.exists(self.output_filename):
-                        df_existing = pd.read_csv(self.output_filename, sep='\t')
-                        df_combined = pd.concat([df_existing, df_new_rows], ignore_index=True)
-                    else:
-                        df_combined = df_new_rows
-                    df_combined.to_csv(self.output_filename, sep='\t', index=False)
-                
-                elif file_format in ['xls', 'xlsx']:
-
-                    if os.path.exists(self.output_filename):
-                        df_existing = pd.read_excel(self.output_filename)
-                        df_combined = pd.concat([df_existing, df_new_rows], ignore_index=True)
-                    else:
-                        df_combined = df_new_rows
-                    df_combined.to_excel(self.output_filename, index=False)
-                
-                else:
-                    raise ValueError("Unsupported file format. Please use 'csv', 'tsv', or 'xls/xlsx'.")
-                
-            else : 
-                df_new_rows = pd.DataFrame(self.new_rows)  
-                self.output_df = pd.concat([self.output_df, df_new_rows])
-
-            self.new_rows = []  # Clear the new_rows after saving
-
-    def augment(self, file_path=None, dataframe=None, column_to_augment=None, total_augmentations=1, style="standard", language="EN", output_filename=None):
-
-        if output_filename is not None and self._extract_file_format(output_filename) not in ["csv","tsv","xls","xlsx"] :
-            raise ValueError("Unsupported output file format. Please use 'csv', 'tsv', or 'xls/xlsx'.")
-        
-        self.output_filename = output_filename
+            # Without an output file the rows stay in output_builder until the run ends, unless
+            # they are streamed to the caller (augment_iter).
+            if self.output_filename or stream:
+                new_rows = self.output_builder.materialize()
+                self.output_builder.clear()
+                if self.checkpoint is not None:
+                    self.checkpoint.add(new_rows, positions)
+                return new_rows
+            return None
+
+    def _validate_inputs(self, file_path, dataframe, output_filename):
+        # Raises for unsupported formats, and for missing optional dependencies before any API call
+        if output_filename is not None:
+            get_format(self._extract_file_format(output_filename)).check_dependencies()
+
+        if file_path is not None:
+            get_format(self._extract_file_format(file_path)).check_dependencies()
 
-        # Load data
         if file_path is None and dataframe is None:
             raise ValueError("You must pass either a data frame or a file path.")
 
         if file_path is not None and dataframe is not None:
             raise ValueError("You can pass either a data frame or a file path, not both.")
         
-        if dataframe is not None:
-            if len(dataframe) != 0 :
-                self._load_data(dataframe=dataframe)
-            else: 
-                raise ValueError("dataframe passed iis empty")
-        elif file_path is not None:
-            self._load_data(file_path=file_path)
-        
+        if dataframe is not None and len(dataframe) == 0:
+            raise ValueError("dataframe passed iis empty")
+
+    def _validate_shard(self, shard_index, num_shards):
+        if num_shards < 1:
+            raise ValueError("num_shards must be at least 1.")
+        if num_shards > 1 and (shard_index is None or not 0 <= shard_index < num_shards):
+            raise ValueError(f"shard_index must be between 0 and {num_shards - 1} when num_shards is {num_shards}.")
+
+    def _resolve_columns(self, column_to_augment, columns_to_augment):
+        if columns_to_augment is not None:
+            if column_to_augment is not None:
+                raise ValueError("You can pass either column_to_augment or columns_to_augment, not both.")
+            if not columns_to_augment:
+                raise ValueError("columns_to_augment must name at least one column.")
+            return list(columns_to_augment)
+        if column_to_augment is None:
+            raise ValueError("You must pass column_to_augment or columns_to_augment.")
+        return [column_to_augment]
+
+    def augment(self, file_path=None, dataframe=None, column_to_augment=None, total_augmentations=1, style="standard", language="EN", output_filename=None, max_concurrency=1, dry_run=False, chunksize=None, columns_to_augment=None, shard_index=None, num_shards=1):
+
+        self._validate_inputs(file_path, dataframe, output_filename)
+        self._validate_shard(shard_index, num_shards)
+        columns = self._resolve_columns(column_to_augment, columns_to_augment)
+        self.output_filename = output_filename
+
+        # Load data; with chunksize the input is read and sorted one chunk at a time
+        frames, total_rows = self._load_frames(file_path=file_path, dataframe=dataframe, chunksize=chunksize)
+        frames, total_rows = self._shard_frames(frames, total_rows, shard_index, num_shards)
+
+        if dry_run:
+            return self._plan_report(frames, columns=columns, total_augmentations=total_augmentations, style=style, language=language)
+
         # Process data
-        self._process_data(column_to_augment=column_to_augment, total_augmentations=total_augmentations, style=style, language=language)
+        self._process_data(column_to_augment=columns, total_augmentations=total_augmentations, style=style, language=language, max_concurrency=max_concurrency, frames=frames, total_rows=total_rows)
 
         if output_filename is None:
             return self.output_df
-   
\ No newline at end of file
+
+    def augment_iter(self, file_path=None, dataframe=None, column_to_augment=None, total_augmentations=1, style="standard", language="EN", output_filename=None, max_concurrency=1, chunksize=10000, columns_to_augment=None, shard_index=None, num_shards=1):
+        # Generator version of augment: yields a small DataFrame of augmented rows as soon as
+        # each batch completes and keeps nothing in memory. Rows are also appended to
+        # output_filename (with its resume journal) when one is given.
+        self._validate_inputs(file_path, dataframe, output_filename)
+        self._validate_shard(shard_index, num_shards)
+        columns = self._resolve_columns(column_to_augment, columns_to_augment)
+        self.output_filename = output_filename
+        frames, _ = self._load_frames(file_path=file_path, dataframe=dataframe, chunksize=chunksize)
+        frames, _ = self._shard_frames(frames, None, shard_index, num_shards)
+
+        self.output_builder = OutputBuilder(columns)
+
+        for positions, frame, groups in self._iter_results(frames, columns, total_augmentations, style, language, max_concurrency):
+            new_rows = self._commit(positions, frame, groups, stream=True)
+            if len(new_rows):
+                yield new_rows
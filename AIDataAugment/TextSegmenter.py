@@ -0,0 +1,72 @@
+import re
+
+# Boundaries tried in order when a piece of text is still longer than a segment.
+BOUNDARIES = (
+    re.compile(r"\n\s*\n"),  # Paragraphs
+    re.compile(r"(?<=[.!?。！？])\s+"),  # Sentences
+    re.compile(r"\s+"),  # Words
+)
+
+
+def _split(text, max_chars, boundaries):
+    # Returns (lead, units): units are [piece, separator] pairs of at most max_chars
+    # characters cut on the coarsest boundary that works, with hard cuts only for a single
+    # word that is too long, and lead is the separator text before the first piece, so
+    # lead + "".join(piece + separator) == text. Pieces are never blank.
+    if not text.strip():
+        return text, []
+    if len(text) <= max_chars:
+        return "", [[text, ""]]
+    if not boundaries:
+        return "", [[text[start:start + max_chars], ""] for start in range(0, len(text), max_chars)]
+
+    lead = ""
+    units = []
+    position = 0
+    for match in list(boundaries[0].finditer(text)) + [None]:
+        end = match.start() if match else len(text)
+        if end > position:
+            piece_lead, piece_units = _split(text[position:end], max_chars, boundaries[1:])
+            if units:
+                units[-1][1] += piece_lead
+            else:
+                lead += piece_lead
+            units.extend(piece_units)
+        if match:
+            if units:
+                units[-1][1] += match.group()
+            else:
+                lead += match.group()
+        position = match.end() if match else len(text)
+    return lead, units
+
+
+def split_text(text, max_chars):
+    # Splits text into (segment, separator) pairs: segments of at most max_chars characters
+    # cut on paragraph, then sentence, then word boundaries, each followed by the separator
+    # that came after it in text, so "".join(segment + separator) rebuilds the text. The
+    # whitespace text starts with is kept as a prefix of the first segment; segments are
+    # never blank, and a blank text has none.
+    lead, units = _split(text, max_chars, BOUNDARIES)
+    segments = []
+    current = ""
+    separator = ""
+
+    for piece, piece_separator in units:
+        if current and len(current) + len(separator) + len(piece) > max_chars:
+            segments.append((current, separator))
+            current = piece
+        else:
+            current = current + separator + piece if current else piece
+        separator = piece_separator
+
+    if current:
+        segments.append((current, separator))
+    if segments and lead:
+        segments[0] = (lead + segments[0][0], segments[0][1])
+    return segments
+
+
+def join_segments(segments, separators):
+    # Stitches rewritten segments back together with the original separators.
+    return "".join(segment + separator for segment, separator in zip(segments, separators)).strip()
@@ -1,3 +1,45 @@
-from .TextAugmentor import TextAugmentor
+import importlib
+import logging
+import sys
+import types
 
-__all__ = ['TextAugmentor']
+# Exports are imported on first access, so `import AIDataAugment` stays cheap.
+_EXPORTS = {
+    'TextAugmentor': '.TextAugmentor',
+    'GenerationBackend': '.GenerationBackend',
+    'GeminiBackend': '.GenerationBackend',
+    'MockBackend': '.GenerationBackend',
+    'QuotaExceededError': '.GenerationBackend',
+    'ShardRunner': '.ShardRunner',
+    'merge_shards': '.ShardRunner',
+    'AugmentMetrics': '.Metrics',
+    'NearDuplicateFilter': '.NearDuplicateFilter',
+}
+
+__all__ = list(_EXPORTS)
+
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+
+class _Package(types.ModuleType):
+    def __setattr__(self, name, value):
+        # Importing a submodule binds it on the package under its name, which for most of
+        # them is also the name of the class they export: keep the export reachable.
+        if name in _EXPORTS and isinstance(value, types.ModuleType):
+            return
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
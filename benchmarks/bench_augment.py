@@ -0,0 +1,169 @@
+"""Benchmark the dataset augmentation path against the offline MockBackend.
+
+Each case runs in a fresh process so peak RSS is per case. Results are printed
+(or written with --output) as JSON, e.g.:
+
+    python benchmarks/bench_augment.py --rows 1000 5000 --distribution uniform longtail
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = ("data augmentation model text language sample training quality generate "
+         "version input output prompt token batch review answer question result").split()
+
+
+def _sentence(rng, length):
+    words = []
+    size = 0
+    while size < length:
+        word = rng.choice(WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)[:max(1, length)]
+
+
+def generate_texts(rows, text_length, distribution="uniform", empty_fraction=0.3, seed=0):
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(rows):
+        if distribution == "uniform":
+            length = text_length
+        elif distribution == "longtail":
+            length = min(int(rng.lognormvariate(0, 1) * text_length), text_length * 50)
+        elif distribution == "empty":
+            length = 0 if rng.random() < empty_fraction else text_length
+        else:
+            raise ValueError(f"Unknown distribution '{distribution}'.")
+        texts.append(_sentence(rng, length) if length else "")
+    return texts
+
+
+def _peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def run_case(case):
+    import pandas as pd
+    from AIDataAugment import TextAugmentor, MockBackend
+    from AIDataAugment.FileFormats import get_format
+
+    logging.disable(logging.WARNING)
+    backend = MockBackend(latency=case["latency"], seed=case["seed"])
+    augmentor = TextAugmentor(backend=backend, requests_per_minute=None)
+    texts = generate_texts(case["rows"], case["text_length"], case["distribution"], seed=case["seed"])
+    source_rows = sum(1 for text in texts if text.strip())
+    result = dict(case)
+
+    if case["mode"] == "string":
+        start = time.perf_counter()
+        outputs = [augmentor.augment_string(text, case["augmentations"]) or [] for text in texts if text.strip()]
+        elapsed = time.perf_counter() - start
+        requests = backend.calls
+        generated = [text for versions in outputs for text in versions]
+    elif case["mode"] == "strings":
+        start = time.perf_counter()
+        outputs = augmentor.augment_strings(texts, case["augmentations"], max_concurrency=case["concurrency"])
+        elapsed = time.perf_counter() - start
+        requests = backend.calls
+        generated = [text for versions in outputs for text in versions]
+    else:
+        dataframe = pd.DataFrame({"text": texts, "label": range(len(texts))})
+        # The output, journal and spool are removed with the directory when the case ends.
+        with tempfile.TemporaryDirectory(prefix="aidataaugment-bench-") as workdir:
+            output_filename = os.path.join(workdir, f"out.{case['format']}") if case["format"] else None
+            start = time.perf_counter()
+            output = augmentor.augment(dataframe=dataframe, column_to_augment="text", total_augmentations=case["augmentations"],
+                                       output_filename=output_filename, max_concurrency=case["concurrency"])
+            elapsed = time.perf_counter() - start
+            requests = backend.calls
+            if output_filename:
+                result["bytes_written"] = os.path.getsize(output_filename)
+                output = get_format(case["format"]).read(output_filename)
+
+                # Resume cost: rerunning a finished job should read the checkpoint and issue no requests.
+                resume_start = time.perf_counter()
+                augmentor.augment(dataframe=dataframe, column_to_augment="text", total_augmentations=case["augmentations"],
+                                  output_filename=output_filename, max_concurrency=case["concurrency"])
+                result["resume_seconds"] = time.perf_counter() - resume_start
+                result["resume_requests"] = backend.calls - requests
+        generated = [str(text) for text in output["text"]]
+
+    generated_chars = sum(len(text) for text in generated)
+    result.update({
+        "seconds": elapsed,
+        "source_rows": source_rows,
+        "generated_rows": len(generated),
+        "rows_per_second": source_rows / elapsed if elapsed else None,
+        "requests": requests,
+        "prompt_chars": backend.prompt_chars,
+        "response_chars": backend.response_chars,
+        "useful_output_chars": generated_chars,
+        "peak_rss_kb": _peak_rss_kb(),
+    })
+    result["requests_per_source_row"] = result["requests"] / source_rows if source_rows else None
+    result["useful_chars_per_prompt_char"] = generated_chars / backend.prompt_chars if backend.prompt_chars else None
+    if "bytes_written" in result and generated:
+        result["bytes_per_generated_row"] = result["bytes_written"] / len(generated)
+    return result
+
+
+def _worker(case, queue):
+    # Keep the progress line off stdout, which carries the JSON report.
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        result = run_case(case)
+    queue.put(result)
+
+
+def run_isolated(case):
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_worker, args=(case, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=["dataset", "string", "strings"], default="dataset")
+    parser.add_argument("--rows", type=int, nargs="+", default=[500])
+    parser.add_argument("--text-length", type=int, nargs="+", default=[200])
+    parser.add_argument("--augmentations", type=int, nargs="+", default=[3])
+    parser.add_argument("--distribution", nargs="+", default=["uniform"], choices=["uniform", "longtail", "empty"])
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds per request.")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--format", default="csv", help="Output file format, or '' to keep results in memory.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout.")
+    args = parser.parse_args(argv)
+
+    results = []
+    for rows, text_length, augmentations, distribution in itertools.product(args.rows, args.text_length, args.augmentations, args.distribution):
+        case = {"mode": args.mode, "rows": rows, "text_length": text_length, "augmentations": augmentations,
+                "distribution": distribution, "latency": args.latency, "concurrency": args.concurrency,
+                "format": args.format, "seed": args.seed}
+        results.append(run_isolated(case))
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Benchmark and guard the package's import and first-call latency.
+
+Each measurement runs in a fresh interpreter and the median over --repeat runs is
+reported as JSON. The exit status is 1 when a median exceeds its limit or when a heavy
+module (pandas, numpy, google.generativeai) is loaded by a path that does not need it, e.g.:
+
+    python benchmarks/bench_startup.py --repeat 7 --max-import-ms 100 --max-first-call-ms 200
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("pandas", "numpy", "google.generativeai")
+
+# Every case prints {"seconds": ..., "loaded": [...]}; seconds excludes interpreter startup.
+CASES = {
+    "import": """
+import time
+start = time.perf_counter()
+import AIDataAugment
+seconds = time.perf_counter() - start
+""",
+    "construct": """
+import time
+start = time.perf_counter()
+from AIDataAugment import TextAugmentor
+TextAugmentor(api_key="unused")
+seconds = time.perf_counter() - start
+""",
+    "first_call": """
+import logging, time
+logging.disable(logging.WARNING)
+start = time.perf_counter()
+from AIDataAugment import TextAugmentor, MockBackend
+augmentor = TextAugmentor(backend=MockBackend(), requests_per_minute=None)
+augmentor.augment_string("A short text to rewrite for the startup benchmark.", 3)
+seconds = time.perf_counter() - start
+""",
+    "first_call_strings": """
+import logging, time
+logging.disable(logging.WARNING)
+start = time.perf_counter()
+from AIDataAugment import TextAugmentor, MockBackend
+augmentor = TextAugmentor(backend=MockBackend(), requests_per_minute=None)
+augmentor.augment_strings(["first short text", "second short text", "third short text"], 3)
+seconds = time.perf_counter() - start
+""",
+}
+
+REPORT = """
+import json, sys
+print(json.dumps({"seconds": seconds, "loaded": [name for name in %r if name in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def run_case(name):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    completed = subprocess.run([sys.executable, "-c", CASES[name] + REPORT], env=env, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--cases", nargs="+", default=list(CASES), choices=list(CASES))
+    parser.add_argument("--max-import-ms", type=float, default=150.0, help="Limit for the import and construct cases.")
+    parser.add_argument("--max-first-call-ms", type=float, default=300.0, help="Limit for the first_call cases.")
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout.")
+    args = parser.parse_args(argv)
+
+    results = []
+    for name in args.cases:
+        runs = [run_case(name) for _ in range(args.repeat)]
+        median_ms = statistics.median(run["seconds"] for run in runs) * 1000
+        limit_ms = args.max_first_call_ms if name.startswith("first_call") else args.max_import_ms
+        loaded = sorted({module for run in runs for module in run["loaded"]})
+        results.append({
+            "case": name,
+            "median_ms": median_ms,
+            "min_ms": min(run["seconds"] for run in runs) * 1000,
+            "limit_ms": limit_ms,
+            "heavy_modules_loaded": loaded,
+            "passed": median_ms <= limit_ms and not loaded,
+        })
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(report + "\n")
+    else:
+        print(report)
+    return 0 if all(result["passed"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,6 +9,9 @@ setup(
         'pandas',
         'openpyxl',
     ],
+    extras_require={
+        'parquet': ['pyarrow'],
+    },
     author='Farouk Daboussi',
     author_email='faroukdaboussi2009@gmail.com',
     description='A Python package for efficient and customizable text augmentation for NLP tasks.',
@@ -20,7 +23,7 @@ setup(
         'License :: OSI Approved :: MIT License',
         'Operating System :: OS Independent',
     ],
-    python_requires='>=3.6',
+    python_requires='>=3.7',
         package_data={
         '': ['usage_example.ipynb'],
     },
@@ -0,0 +1,101 @@
+import os
+import random
+
+import pandas as pd
+import pytest
+
+from AIDataAugment import MockBackend, TextAugmentor
+from AIDataAugment.BatchPlanner import BatchPlanner
+
+
+def loads(planner, bins, lengths, num_versions):
+    return [
+        (sum(planner.row_cost(lengths[i], num_versions)[0] for i in packed),
+         sum(planner.row_cost(lengths[i], num_versions)[1] for i in packed))
+        for packed in bins
+    ]
+
+
+def test_pack_respects_budgets():
+    rng = random.Random(0)
+    planner = BatchPlanner(2000, input_token_budget=3000, prompt_overhead_chars=400, row_overhead_chars=20, version_line_chars=60)
+    lengths = [rng.randint(10, 3000) for _ in range(500)]
+
+    bins, oversized = planner.pack(lengths, 3)
+
+    assert sorted([i for packed in bins for i in packed] + oversized) == list(range(len(lengths)))
+    input_budget = 3000 - planner.tokens(400)
+    for input_tokens, output_tokens in loads(planner, bins, lengths, 3):
+        assert output_tokens <= 2000
+        assert input_tokens <= input_budget
+    for i in oversized:
+        assert planner.row_cost(lengths[i], 3)[1] > 2000
+
+
+def test_pack_first_fit_decreasing():
+    planner = BatchPlanner(100, chars_per_token=1.0, output_ratio=1.0, marker_chars=0)
+
+    bins, oversized = planner.pack([60, 30, 50, 40, 20, 150], 1)
+
+    assert oversized == [5]
+    assert bins == [[0, 3], [2, 1, 4]]
+
+
+def test_max_versions_per_prompt():
+    planner = BatchPlanner(100, chars_per_token=1.0, output_ratio=1.0, marker_chars=0)
+
+    assert planner.max_versions_per_prompt(30) == 3
+    assert planner.max_versions_per_prompt(500) == 1
+
+
+def test_report_counts_calls():
+    planner = BatchPlanner(100, chars_per_token=1.0, output_ratio=1.0, marker_chars=0)
+
+    report = planner.report([60, 30, 50, 40, 20, 150], 1)
+
+    assert report["batch_calls"] == 2
+    assert report["single_row_calls"] == 1
+    assert report["calls"] == 3
+    assert report["expected_fill_ratio"] == pytest.approx(200 / 200)
+
+
+def test_dry_run_matches_calls():
+    rng = random.Random(1)
+    words = "alpha beta gamma delta epsilon zeta eta theta".split()
+    frame = pd.DataFrame({"text": [" ".join(rng.choice(words) for _ in range(rng.randint(3, 400))) for _ in range(300)]})
+    backend = MockBackend()
+    augmentor = TextAugmentor(backend=backend, requests_per_minute=None)
+    augmentor.max_output_tokens = 2000
+
+    report = augmentor.augment(dataframe=frame, column_to_augment="text", total_augmentations=3, dry_run=True)
+    output = augmentor.augment(dataframe=frame, column_to_augment="text", total_augmentations=3)
+
+    assert backend.calls == report["calls"]
+    assert report["rows"] == len(frame)
+    assert len(output) == 3 * len(frame)
+
+
+def test_dry_run_writes_nothing(tmp_path):
+    frame = pd.DataFrame({"text": [f"text number {i} to rewrite" for i in range(6)]})
+    output = str(tmp_path / "out.csv")
+    augmentor = TextAugmentor(backend=MockBackend(), requests_per_minute=None)
+    augmentor.flush_every = 1
+    augmentor.augment(dataframe=frame.iloc[:3], column_to_augment="text", total_augmentations=2, output_filename=output)
+    with open(output, "a", encoding="utf-8") as data:
+        data.write("a row a live run has not journaled yet\n")
+    files = {name: (tmp_path / name).read_bytes() for name in os.listdir(tmp_path)}
+
+    report = augmentor.augment(dataframe=frame, column_to_augment="text", total_augmentations=2, output_filename=output, dry_run=True)
+
+    assert report["rows"] == 3
+    assert {name: (tmp_path / name).read_bytes() for name in os.listdir(tmp_path)} == files
+
+
+def test_dry_run_without_output_file(tmp_path):
+    frame = pd.DataFrame({"text": ["one text", "another text"]})
+    augmentor = TextAugmentor(backend=MockBackend(), requests_per_minute=None)
+
+    report = augmentor.augment(dataframe=frame, column_to_augment="text", output_filename=str(tmp_path / "out.csv"), dry_run=True)
+
+    assert report["rows"] == 2
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,316 @@
+import json
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from AIDataAugment import MockBackend, TextAugmentor
+from AIDataAugment.CheckpointWriter import CheckpointWriter
+from AIDataAugment.FileFormats import get_format
+
+
+def rows(*values):
+    return pd.DataFrame({"text": [f"row {value}" for value in values]})
+
+
+def writer_for(path, **kwargs):
+    kwargs.setdefault("flush_every", 1)
+    kwargs.setdefault("fsync_every", 0)
+    return CheckpointWriter(str(path), get_format(str(path).rsplit(".", 1)[-1]), **kwargs)
+
+
+def journal_lines(path):
+    with open(str(path) + ".journal", encoding="utf-8") as journal:
+        return [json.loads(line) for line in journal]
+
+
+class Crash(Exception):
+    pass
+
+
+def test_resume_after_clean_run(tmp_path):
+    path = tmp_path / "out.csv"
+    writer = writer_for(path)
+    writer.add(rows(0), [0])
+    writer.add(rows(1), [1])
+    writer.close()
+
+    resumed = writer_for(path)
+
+    assert resumed.next_position == 2
+    assert resumed.rows_written == 2
+    assert list(pd.read_csv(path)["text"]) == ["row 0", "row 1"]
+
+
+def test_out_of_order_positions(tmp_path):
+    path = tmp_path / "out.csv"
+    writer = writer_for(path)
+    writer.add(rows(2), [2])
+    writer.add(rows(5), [5])
+    assert writer.next_position == 0
+    writer.add(rows(0, 1), [0, 1])
+    writer.close()
+
+    resumed = writer_for(path)
+
+    assert resumed.next_position == 3
+    assert [resumed.is_complete(position) for position in range(7)] == [True, True, True, False, False, True, False]
+
+
+def test_buffered_rows_flush_together(tmp_path):
+    path = tmp_path / "out.csv"
+    writer = writer_for(path, flush_every=3, flush_interval=3600)
+    writer.add(rows(0), [0])
+    writer.add(rows(1), [1])
+    assert not path.exists()
+    writer.add(rows(2), [2])
+
+    assert len(pd.read_csv(path)) == 3
+    assert len(journal_lines(path)) == 1
+
+
+@pytest.mark.parametrize("extension", ["csv", "jsonl", "parquet"])
+def test_crash_between_data_and_journal(tmp_path, monkeypatch, extension):
+    if extension == "parquet":
+        pytest.importorskip("pyarrow")
+    path = tmp_path / f"out.{extension}"
+    writer = writer_for(path)
+    writer.add(rows(0), [0])
+
+    # The data of the second flush reaches the file, its journal line does not.
+    def crash(*args):
+        raise Crash()
+    monkeypatch.setattr(writer, "_write_journal", crash)
+    with pytest.raises(Crash):
+        writer.add(rows(1), [1])
+
+    resumed = writer_for(path)
+    assert resumed.next_position == 1
+    assert resumed.rows_written == 1
+
+    resumed.add(rows(1), [1])
+    resumed.close()
+    assert list(get_format(extension).read(str(path))["text"]) == ["row 0", "row 1"]
+
+
+def read_rows(path):
+    return list(get_format(str(path).rsplit(".", 1)[-1]).read(str(path))["text"])
+
+
+def spooled_run(path, monkeypatch, crash_in):
+    # Writes rows 0-3 through the spool and crashes in close(), in crash_in.
+    writer = writer_for(path)
+    for position in range(4):
+        writer.add(rows(position), [position])
+
+    def crash(*args):
+        raise Crash()
+    if crash_in == "materialize":
+        def materialize_spool(path, spool_path, tmp_path):
+            with open(tmp_path, "wb") as tmp:
+                tmp.write(b"half a file")
+            raise Crash()
+        monkeypatch.setattr(writer.file_format, "materialize_spool", materialize_spool)
+    elif crash_in == "replace":
+        monkeypatch.setattr(writer, "_finish_materialize", crash)
+    elif crash_in == "remove":
+        remove = os.remove
+        monkeypatch.setattr(os, "remove", lambda name: crash() if name == writer.spool_path else remove(name))
+    with pytest.raises(Crash):
+        writer.close()
+    monkeypatch.undo()
+
+
+@pytest.mark.parametrize("extension", ["parquet", "xlsx"])
+@pytest.mark.parametrize("crash_in", ["materialize", "replace", "remove"])
+def test_crash_while_materializing(tmp_path, monkeypatch, extension, crash_in):
+    if extension == "parquet":
+        pytest.importorskip("pyarrow")
+    path = tmp_path / f"out.{extension}"
+    spooled_run(path, monkeypatch, crash_in)
+
+    resumed = writer_for(path)
+    assert resumed.next_position == 4
+    resumed.close()
+    resumed.close()
+
+    assert read_rows(path) == [f"row {position}" for position in range(4)]
+    assert sorted(os.listdir(tmp_path)) == [f"out.{extension}", f"out.{extension}.journal"]
+
+
+def test_resume_after_materializing_appends(tmp_path):
+    path = tmp_path / "out.xlsx"
+    writer = writer_for(path)
+    writer.add(rows(0), [0])
+    writer.close()
+
+    resumed = writer_for(path)
+    resumed.add(rows(1), [1])
+    resumed.close()
+
+    assert read_rows(path) == ["row 0", "row 1"]
+    assert writer_for(path).next_position == 2
+
+
+def test_torn_journal_line_is_ignored(tmp_path):
+    path = tmp_path / "out.csv"
+    writer = writer_for(path)
+    writer.add(rows(0), [0])
+    writer.close()
+    with open(str(path) + ".journal", "a", encoding="utf-8") as journal:
+        journal.write('{"next": 7, "ahe')
+
+    resumed = writer_for(path)
+    assert resumed.next_position == 1
+    resumed.add(rows(1), [1])
+    resumed.close()
+
+    assert [line["next"] for line in journal_lines(path)] == [1, 2]
+    assert list(pd.read_csv(path)["text"]) == ["row 0", "row 1"]
+
+
+def test_journal_ahead_of_lost_data(tmp_path):
+    # With fsync disabled the journal can reach the disk while the data it records does not:
+    # resume falls back to the last state whose data is in the file.
+    path = tmp_path / "out.csv"
+    writer = writer_for(path)
+    writer.add(rows(0), [0])
+    size = os.path.getsize(path)
+    writer.add(rows(1), [1])
+    writer.close()
+    with open(path, "r+b") as data:
+        data.truncate(size)
+
+    resumed = writer_for(path)
+
+    assert resumed.next_position == 1
+    assert resumed.rows_written == 1
+
+
+def test_read_only_leaves_files_alone(tmp_path):
+    path = tmp_path / "out.csv"
+    writer = writer_for(path)
+    writer.add(rows(0), [0])
+    writer.add(rows(2), [2])
+    with open(path, "a", encoding="utf-8") as data:
+        data.write("row 1\n")  # Appended by a live run, not journaled yet
+    with open(str(path) + ".journal", "a", encoding="utf-8") as journal:
+        journal.write('{"next": 7, "ahe')
+    before = (path.read_bytes(), (tmp_path / "out.csv.journal").read_bytes())
+
+    reader = writer_for(path, read_only=True)
+    reader.add(None, [1])
+    reader.close()
+
+    assert reader.next_position == 3
+    assert reader.is_complete(2)
+    assert (path.read_bytes(), (tmp_path / "out.csv.journal").read_bytes()) == before
+    with pytest.raises(ValueError, match="read-only"):
+        reader.add(rows(3), [3])
+
+
+def test_legacy_journal_without_sizes(tmp_path):
+    path = tmp_path / "out.csv"
+    rows(0, 1).to_csv(path, index=False)
+    with open(str(path) + ".journal", "w", encoding="utf-8") as journal:
+        journal.write(json.dumps({"next": 2, "ahead": [4], "rows": 2}) + "\n")
+
+    resumed = writer_for(path)
+
+    assert resumed.next_position == 2
+    assert resumed.is_complete(4)
+    assert len(pd.read_csv(path)) == 2
+
+
+def test_ahead_positions_are_journaled_as_deltas(tmp_path):
+    path = tmp_path / "out.csv"
+    writer = writer_for(path)
+    writer.add(rows(100), [100])  # First line of a run: full set
+    for position in range(101, 140):
+        writer.add(rows(position), [position])
+    writer.close()
+
+    lines = journal_lines(path)
+    assert lines[0]["ahead"] == [100]
+    assert all(len(line.get("ahead", line.get("added"))) <= 40 for line in lines)
+    assert sum("added" in line for line in lines) > len(lines) // 2
+
+    resumed = writer_for(path)
+    assert resumed.next_position == 0
+    assert all(resumed.is_complete(position) for position in range(100, 140))
+    assert not resumed.is_complete(99) and not resumed.is_complete(140)
+
+
+def test_deltas_folded_into_next(tmp_path):
+    path = tmp_path / "out.csv"
+    writer = writer_for(path)
+    for position in [5, 3, 8, 1, 0, 2, 4, 9]:
+        writer.add(rows(position), [position])
+    writer.close()
+
+    resumed = writer_for(path)
+
+    assert resumed.next_position == 6
+    assert [resumed.is_complete(position) for position in range(6, 11)] == [False, False, True, True, False]
+
+
+def test_resume_with_deltas_after_crash(tmp_path, monkeypatch):
+    path = tmp_path / "out.csv"
+    writer = writer_for(path)
+    for position in [10, 11, 0, 12]:
+        writer.add(rows(position), [position])
+
+    def crash(*args):
+        raise Crash()
+    monkeypatch.setattr(writer, "_write_journal", crash)
+    with pytest.raises(Crash):
+        writer.add(rows(13), [13])
+
+    resumed = writer_for(path)
+    assert resumed.next_position == 1
+    assert [resumed.is_complete(position) for position in range(10, 14)] == [True, True, True, False]
+    assert list(pd.read_csv(path)["text"]) == ["row 10", "row 11", "row 0", "row 12"]
+
+
+def block_pyarrow(monkeypatch):
+    for name in ("pyarrow", "pyarrow.ipc", "pyarrow.parquet"):
+        monkeypatch.setitem(sys.modules, name, None)
+
+
+def test_excel_output_does_not_need_pyarrow(tmp_path):
+    # A fresh interpreter: pandas backs its strings with pyarrow when it was importable.
+    script = """
+import sys
+sys.modules["pyarrow"] = None
+import pandas as pd
+from AIDataAugment.CheckpointWriter import CheckpointWriter
+from AIDataAugment.FileFormats import get_format
+
+writer = CheckpointWriter(sys.argv[1], get_format("xlsx"), flush_every=1, fsync_every=0)
+writer.add(pd.DataFrame({"text": ["a"], "zip": ["007"], "at": [pd.Timestamp("2020-01-02")]}), [0])
+writer.add(pd.DataFrame({"text": ["b"], "zip": [None], "at": [pd.Timestamp("2020-01-03")]}), [1])
+writer.close()
+"""
+    path = tmp_path / "out.xlsx"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")])))
+    subprocess.run([sys.executable, "-c", script, str(path)], env=env, check=True)
+
+    output = pd.read_excel(path, dtype=object)
+    assert list(output["text"]) == ["a", "b"]
+    assert output["zip"].iloc[0] == "007"
+    assert list(output["at"]) == [pd.Timestamp("2020-01-02"), pd.Timestamp("2020-01-03")]
+    assert sorted(os.listdir(tmp_path)) == ["out.xlsx", "out.xlsx.journal"]
+
+
+def test_missing_pyarrow_fails_before_any_call(tmp_path, monkeypatch):
+    block_pyarrow(monkeypatch)
+    backend = MockBackend()
+    augmentor = TextAugmentor(backend=backend, requests_per_minute=None)
+
+    with pytest.raises(ImportError, match="pyarrow"):
+        augmentor.augment(dataframe=rows(0, 1), column_to_augment="text", output_filename=str(tmp_path / "out.parquet"))
+    assert backend.calls == 0
+    assert not os.listdir(tmp_path)
@@ -0,0 +1,130 @@
+import os
+
+import pandas as pd
+import pytest
+
+from AIDataAugment.CheckpointWriter import CheckpointWriter
+from AIDataAugment.FileFormats import get_format
+
+pytest.importorskip("pyarrow")
+
+SPOOLED = ["parquet", "arrow", "xlsx"]
+
+
+def mixed_frame(start, rows, late=None):
+    # A column of dates, strings that look like numbers, nullable floats and a column that
+    # is only filled in later chunks.
+    return pd.DataFrame({
+        "text": [f"version {i}" for i in range(start, start + rows)],
+        "zip": ["007"] * rows,
+        "created_at": pd.date_range("2020-01-01", periods=rows, freq="h") + pd.Timedelta(hours=start),
+        "score": [1.5 if i % 2 else None for i in range(rows)],
+        "late": [late] * rows,
+    })
+
+
+def read_back(extension, path):
+    if extension == "xlsx":
+        return pd.read_excel(path, dtype=object)
+    return get_format(extension).read(path)
+
+
+@pytest.mark.parametrize("extension", SPOOLED)
+def test_spooled_output_keeps_types(tmp_path, extension):
+    path = str(tmp_path / f"out.{extension}")
+    writer = CheckpointWriter(path, get_format(extension), flush_every=1, fsync_every=0)
+    writer.add(mixed_frame(0, 3), [0])
+    writer.add(mixed_frame(3, 3, late="x"), [1])
+    writer.close()
+
+    output = read_back(extension, path)
+
+    assert len(output) == 6
+    assert list(output["zip"]) == ["007"] * 6
+    assert list(pd.to_datetime(output["created_at"])) == list(pd.date_range("2020-01-01", periods=6, freq="h"))
+    assert list(output["late"].iloc[3:]) == ["x"] * 3
+    assert output["late"].iloc[:3].isna().all()
+    assert output["score"].isna().sum() == 4
+    assert not (tmp_path / f"out.{extension}.tmp").exists()
+    assert not os.path.exists(path + get_format(extension).spool_suffix)
+
+
+@pytest.mark.parametrize("extension", ["parquet", "arrow"])
+def test_typed_output_dtypes(tmp_path, extension):
+    path = str(tmp_path / f"out.{extension}")
+    writer = CheckpointWriter(path, get_format(extension), flush_every=1, fsync_every=0)
+    writer.add(mixed_frame(0, 2), [0])
+    writer.add(mixed_frame(2, 2, late="x"), [1])
+    writer.close()
+
+    output = get_format(extension).read(path)
+
+    assert pd.api.types.is_datetime64_any_dtype(output["created_at"])
+    assert pd.api.types.is_float_dtype(output["score"])
+    assert pd.api.types.is_string_dtype(output["late"])
+
+
+@pytest.mark.parametrize("extension", ["parquet", "arrow"])
+def test_spool_appends_to_existing_file(tmp_path, extension):
+    path = str(tmp_path / f"out.{extension}")
+    file_format = get_format(extension)
+    file_format.write(path, mixed_frame(0, 2))
+
+    writer = CheckpointWriter(path, file_format, flush_every=1, fsync_every=0)
+    writer.add(mixed_frame(2, 2, late="x"), [0])
+    writer.close()
+
+    output = file_format.read(path)
+    assert list(output["text"]) == [f"version {i}" for i in range(4)]
+    assert list(output["late"].iloc[2:]) == ["x", "x"]
+
+
+@pytest.mark.parametrize("extension", ["csv", "tsv", "jsonl", "parquet", "arrow"])
+def test_write_read_roundtrip(tmp_path, extension):
+    path = str(tmp_path / f"out.{extension}")
+    frame = pd.DataFrame({"text": ["a, b", "c\td"], "count": [1, 2]})
+    file_format = get_format(extension)
+    file_format.write(path, frame)
+
+    output = file_format.read(path)
+
+    assert list(output["text"]) == ["a, b", "c\td"]
+    assert list(output["count"]) == [1, 2]
+    assert file_format.count_rows(path) == 2
+
+
+def test_unknown_extension():
+    with pytest.raises(ValueError, match="Unsupported file format"):
+        get_format("docx")
+
+
+def test_jsonl_input_is_read_verbatim(tmp_path):
+    path = tmp_path / "in.jsonl"
+    path.write_text('{"zip":"007","created_at":1600000000000,"text":"hello"}\n', encoding="utf-8")
+
+    frame = get_format("jsonl").read(str(path))
+    chunk = next(iter(get_format("jsonl").read_chunks(str(path), 10)))
+
+    for read in (frame, chunk):
+        assert read["zip"].iloc[0] == "007"
+        assert read["created_at"].iloc[0] == 1600000000000
+
+
+def test_jsonl_output_is_strict_json(tmp_path):
+    import json
+
+    path = str(tmp_path / "out.jsonl")
+    writer = CheckpointWriter(path, get_format("jsonl"), flush_every=1, fsync_every=0)
+    writer.add(pd.DataFrame({"text": ["ä", "b"], "score": [1.5, None], "zip": ["007", None]}), [0])
+    writer.add(pd.DataFrame({"text": ["c"], "score": [2.0], "zip": ["008"]}), [1])
+    writer.close()
+
+    with open(path, encoding="utf-8") as handle:
+        lines = handle.read().splitlines()
+
+    records = [json.loads(line, parse_constant=lambda token: pytest.fail(f"invalid JSON token {token}")) for line in lines]
+    assert records == [
+        {"text": "ä", "score": 1.5, "zip": "007"},
+        {"text": "b", "score": None, "zip": None},
+        {"text": "c", "score": 2.0, "zip": "008"},
+    ]
@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+from AIDataAugment import AugmentMetrics, MockBackend, TextAugmentor
+
+
+def source_frame(rows=30):
+    return pd.DataFrame({"text": [f"source text number {i} to rewrite" for i in range(rows)]})
+
+
+def run_with_metrics(run):
+    augmentor = TextAugmentor(backend=MockBackend(), requests_per_minute=None)
+    metrics = AugmentMetrics()
+    events = []
+    augmentor.add_hook(metrics)
+    augmentor.add_hook(lambda event, data: events.append((event, data)))
+    output = run(augmentor)
+    return metrics, events, output
+
+
+@pytest.mark.parametrize("to_file", [False, True])
+def test_augment_iter_reports_rows(tmp_path, to_file):
+    output_filename = str(tmp_path / "out.csv") if to_file else None
+
+    metrics, events, chunks = run_with_metrics(lambda augmentor: list(augmentor.augment_iter(
+        dataframe=source_frame(), column_to_augment="text", total_augmentations=2, output_filename=output_filename)))
+
+    snapshot = metrics.snapshot()
+    assert sum(len(chunk) for chunk in chunks) == 60
+    assert snapshot["counters"]["source_rows"] == 30
+    assert snapshot["counters"]["output_rows"] == 60
+    assert snapshot["rows_per_second"] > 0
+    assert [data["rows"] for event, data in events if event == "run_end"] == [30]
+    if to_file:
+        assert snapshot["counters"]["rows_written"] == 60
+        assert len(pd.read_csv(output_filename)) == 60
+
+
+def test_augment_and_augment_iter_report_the_same_rows():
+    augment_metrics, _, _ = run_with_metrics(lambda augmentor: augmentor.augment(
+        dataframe=source_frame(), column_to_augment="text", total_augmentations=2))
+    iter_metrics, _, _ = run_with_metrics(lambda augmentor: list(augmentor.augment_iter(
+        dataframe=source_frame(), column_to_augment="text", total_augmentations=2)))
+
+    for key in ("source_rows", "output_rows", "batches", "versions_requested"):
+        assert iter_metrics.counters[key] == augment_metrics.counters[key]
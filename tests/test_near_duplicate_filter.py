@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from AIDataAugment import NearDuplicateFilter
+
+SOURCE = "The quick brown fox jumps over the lazy dog near the river bank."
+DISTINCT = [
+    "A fast auburn fox leaps above a sleepy hound by the water's edge.",
+    "Near the riverside, a lazy dog is vaulted over by a speedy fox.",
+    "By the stream, one agile fox hopped across a drowsy canine.",
+]
+
+
+def test_drops_copies_of_the_input_and_repeated_versions():
+    dedup = NearDuplicateFilter(threshold=0.8)
+
+    keep = dedup.select(
+        [SOURCE],
+        [[DISTINCT[0], SOURCE, DISTINCT[0] + " ", DISTINCT[1], None]],
+        [[True] * 5],
+    )
+
+    assert keep.tolist() == [[True, False, False, True, False]]
+
+
+def test_rows_are_independent():
+    dedup = NearDuplicateFilter(threshold=0.8)
+
+    keep = dedup.select([SOURCE, DISTINCT[2]], [[DISTINCT[0], DISTINCT[1]], [DISTINCT[0], DISTINCT[1]]], [[True, True], [True, True]])
+
+    assert keep.all()
+
+
+def test_versions_that_are_not_fresh_are_kept():
+    dedup = NearDuplicateFilter(threshold=0.8)
+
+    keep = dedup.select([SOURCE], [[SOURCE, SOURCE, DISTINCT[0]]], [[False, True, True]])
+
+    assert keep.tolist() == [[True, False, True]]
+
+
+def test_across_output():
+    dedup = NearDuplicateFilter(threshold=0.8, across_output=True)
+
+    first = dedup.select([SOURCE], [[DISTINCT[0], DISTINCT[1]]], [[True, True]])
+    second = dedup.select([DISTINCT[2]], [[DISTINCT[1], "Something else entirely, with other words in it."]], [[True, True]])
+
+    assert first.all()
+    assert second.tolist() == [[False, True]]
+
+    dedup.reset()
+    assert dedup.select([DISTINCT[2]], [[DISTINCT[1]]], [[True]]).all()
+
+
+def test_signatures_estimate_similarity():
+    dedup = NearDuplicateFilter(num_perm=128)
+    signatures = dedup.signatures([SOURCE, SOURCE.replace("lazy", "idle"), DISTINCT[0], "ab"])
+
+    assert signatures.shape == (4, 128)
+    similarity = (signatures[0] == signatures).mean(axis=1)
+    assert similarity[1] > 0.5
+    assert similarity[2] < 0.2
+    assert np.array_equal(dedup.signatures([SOURCE])[0], signatures[0])
+
+
+def test_invalid_parameters():
+    with pytest.raises(ValueError):
+        NearDuplicateFilter(threshold=0)
+    with pytest.raises(ValueError):
+        NearDuplicateFilter(num_perm=64, bands=5)
@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import AIDataAugment
+
+
+def run_fresh(code):
+    # A fresh interpreter: which submodules are already imported decides what the package
+    # attributes are bound to, so the result must not depend on the other tests.
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")])))
+    return subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True).stdout
+
+
+def test_exports_survive_importing_their_submodule():
+    output = run_fresh(
+        "import AIDataAugment.GenerationBackend, AIDataAugment.ShardRunner, AIDataAugment.TextAugmentor\n"
+        "from AIDataAugment import GenerationBackend, ShardRunner, TextAugmentor\n"
+        "print(all(isinstance(export, type) for export in (GenerationBackend, ShardRunner, TextAugmentor)))\n"
+    )
+
+    assert output.strip() == "True"
+
+
+def test_exports_after_importing_a_sibling():
+    output = run_fresh(
+        "from AIDataAugment import MockBackend\n"
+        "from AIDataAugment import GenerationBackend\n"
+        "print(isinstance(GenerationBackend, type) and issubclass(MockBackend, GenerationBackend))\n"
+    )
+
+    assert output.strip() == "True"
+
+
+def test_import_is_lazy():
+    output = run_fresh(
+        "import sys, AIDataAugment\n"
+        "print(sorted(name for name in sys.modules if name.startswith('AIDataAugment.')))\n"
+    )
+
+    assert output.strip() == "[]"
+
+
+def test_unknown_attribute():
+    assert "TextAugmentor" in dir(AIDataAugment)
+    with pytest.raises(AttributeError, match="NoSuchExport"):
+        AIDataAugment.NoSuchExport
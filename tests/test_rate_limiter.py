@@ -0,0 +1,154 @@
+import sys
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from AIDataAugment import GenerationBackend, MockBackend, QuotaExceededError, TextAugmentor
+from AIDataAugment.RateLimiter import RateLimiter
+
+
+class FakeClock:
+    # Stands in for the time module of RateLimiter: sleeping advances the clock at once.
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 6))
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(sys.modules[RateLimiter.__module__], "time", clock)
+    return clock
+
+
+def test_request_bucket_refills(clock):
+    limiter = RateLimiter(requests_per_minute=60)
+
+    for _ in range(60):
+        limiter.acquire()
+    assert clock.sleeps == []
+
+    limiter.acquire()
+    assert clock.sleeps == [1.0]
+    clock.now += 30
+    for _ in range(30):
+        limiter.acquire()
+    assert clock.sleeps == [1.0]
+
+
+def test_token_bucket_refills(clock):
+    limiter = RateLimiter(tokens_per_minute=600)
+
+    limiter.acquire(500)
+    limiter.acquire(200)  # 100 tokens short at 10 tokens a second
+
+    assert clock.sleeps == [10.0]
+
+
+def test_request_larger_than_the_token_bucket_is_admitted(clock):
+    limiter = RateLimiter(tokens_per_minute=600)
+    limiter.acquire(300)
+
+    limiter.acquire(5000)  # Waits for a full bucket instead of forever
+
+    assert clock.sleeps == [30.0]
+
+
+def test_unlimited_limiter_never_waits(clock):
+    limiter = RateLimiter()
+    for _ in range(1000):
+        limiter.acquire(10 ** 6)
+
+    assert clock.sleeps == []
+
+
+def test_backoff_pauses_every_caller():
+    limiter = RateLimiter(requests_per_minute=6000)
+    limiter.backoff(0.2)
+    start = time.monotonic()
+    waited = []
+
+    def call():
+        limiter.acquire()
+        waited.append(time.monotonic() - start)
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(waited) == 4
+    assert min(waited) >= 0.2
+
+
+class QuotaBackend(GenerationBackend):
+    # Raises QuotaExceededError for the first `failures` calls, then answers like MockBackend.
+    model_name = "quota"
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+        self.mock = MockBackend()
+
+    def generate(self, prompt):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise QuotaExceededError("429 Resource has been exhausted")
+        return self.mock.generate(prompt)
+
+
+def quota_augmentor(backend):
+    augmentor = TextAugmentor(backend=backend, requests_per_minute=None)
+    augmentor.max_quota_retries = 3
+    augmentor.backoff_base = 2.0
+    retries = []
+    augmentor.add_hook(lambda event, data: retries.append(data["reason"]) if event == "retry" else None)
+    return augmentor, retries
+
+
+def test_quota_errors_back_off_then_succeed(clock):
+    backend = QuotaBackend(failures=2)
+    augmentor, retries = quota_augmentor(backend)
+
+    versions = augmentor.augment_string("a text that hits the quota twice", 2)
+
+    assert len(versions) == 2
+    assert backend.calls == 3
+    assert clock.sleeps == [2.0, 4.0]
+    assert retries == ["quota", "quota"]
+
+
+def test_quota_errors_are_raised_after_max_quota_retries(clock):
+    backend = QuotaBackend(failures=100)
+    augmentor, retries = quota_augmentor(backend)
+
+    with pytest.raises(QuotaExceededError):
+        augmentor.augment_string("a text that always hits the quota", 2)
+
+    assert backend.calls == 4
+    assert clock.sleeps == [2.0, 4.0, 8.0]
+    assert retries == ["quota"] * 3
+
+
+def test_concurrent_output_matches_serial():
+    frame = pd.DataFrame({"id": range(120), "text": [f"source text number {i} " + "word " * (i % 40) for i in range(120)]})
+
+    def run(max_concurrency):
+        augmentor = TextAugmentor(backend=MockBackend(latency=0.002, jitter=0.002), requests_per_minute=None)
+        augmentor.max_output_tokens = 600  # Many small batches
+        return augmentor.augment(dataframe=frame, column_to_augment="text", total_augmentations=2, max_concurrency=max_concurrency)
+
+    serial = run(1)
+
+    pd.testing.assert_frame_equal(run(4), serial)
+    assert len(serial) == 240
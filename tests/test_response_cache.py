@@ -0,0 +1,95 @@
+import sys
+
+import pandas as pd
+
+from AIDataAugment import MockBackend, TextAugmentor
+from AIDataAugment.ResponseCache import ResponseCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        self.now += 1
+        return self.now
+
+
+class RecordingBackend(MockBackend):
+    def __init__(self):
+        super().__init__()
+        self.prompts = []
+
+    def generate(self, prompt):
+        self.prompts.append(prompt)
+        return super().generate(prompt)
+
+
+def source_frame():
+    texts = ["the same text to rewrite", "another text to rewrite", "the same text to rewrite", "a third text to rewrite", "the same text to rewrite"]
+    return pd.DataFrame({"id": range(len(texts)), "text": texts})
+
+
+def test_lru_eviction_keeps_recently_read_keys(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys.modules[ResponseCache.__module__], "time", FakeClock())
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_bytes=350)
+    versions = ["x" * 96]  # 100 bytes as JSON
+
+    for key in ("a", "b", "c"):
+        cache.put(key, versions)
+    assert cache.get("a") == versions
+    cache.put("d", versions)  # Over budget: the least recently used entry goes
+
+    assert cache.get("b") is None
+    assert all(cache.get(key) == versions for key in ("a", "c", "d"))
+    cache.close()
+
+
+def test_size_survives_reopening(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(path)
+    cache.put("a", ["one", "two"])
+    cache.put("a", ["one"])
+    cache.close()
+
+    reopened = ResponseCache(path)
+    assert reopened._size == len('["one"]')
+    assert reopened.get("a") == ["one"]
+    reopened.close()
+
+
+def test_key_normalizes_whitespace():
+    key = ResponseCache.make_key("some  text\n", "standard", "EN", "mock", 2)
+
+    assert key == ResponseCache.make_key(" some text", "standard", "EN", "mock", 2)
+    assert key != ResponseCache.make_key("some text", "standard", "EN", "mock", 3)
+    assert key != ResponseCache.make_key("some text", "standard", "EN", "other-model", 2)
+
+
+def test_second_run_is_served_from_the_cache(tmp_path):
+    cache_path = str(tmp_path / "cache.sqlite")
+    first = TextAugmentor(backend=MockBackend(), requests_per_minute=None, cache_path=cache_path)
+    expected = first.augment(dataframe=source_frame(), column_to_augment="text", total_augmentations=2)
+    first.cache.close()
+
+    backend = MockBackend()
+    second = TextAugmentor(backend=backend, requests_per_minute=None, cache_path=cache_path)
+    output = second.augment(dataframe=source_frame(), column_to_augment="text", total_augmentations=2)
+
+    assert backend.calls == 0
+    assert second.cache.misses == 0 and second.cache.hits == 3  # One lookup per distinct text
+    pd.testing.assert_frame_equal(output, expected)
+
+
+def test_identical_rows_are_requested_once():
+    backend = RecordingBackend()
+    augmentor = TextAugmentor(backend=backend, requests_per_minute=None)
+
+    output = augmentor.augment(dataframe=source_frame(), column_to_augment="text", total_augmentations=2)
+
+    prompts = "\n".join(backend.prompts)
+    assert prompts.count("the same text to rewrite") == 1
+    versions = {id_: list(rows["text"]) for id_, rows in output.groupby("id")}
+    assert len(output) == 10
+    assert versions[0] == versions[2] == versions[4]
+    assert versions[0] != versions[1]
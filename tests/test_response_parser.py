@@ -0,0 +1,62 @@
+from AIDataAugment import GenerationBackend, TextAugmentor
+from AIDataAugment.ResponseParser import parse_versions
+
+
+def test_single_text_markers():
+    response = "&&version_1&& First version.\n&&version_2&&\nSecond\nversion.\n"
+
+    assert parse_versions(response) == {(1, 1, 1): "First version.", (1, 1, 2): "Second\nversion."}
+
+
+def test_batch_and_field_markers():
+    response = (
+        "&&text_1_version_1&& a1 &&text_2_version_1&& b1\n"
+        "&&text_1_field_2_version_3&& answer"
+    )
+
+    assert parse_versions(response) == {(1, 1, 1): "a1", (2, 1, 1): "b1", (1, 2, 3): "answer"}
+
+
+def test_repeated_marker_keeps_first_non_empty_text():
+    response = "&&text_1_version_1&&\n&&text_1_version_1&& kept\n&&text_1_version_1&& ignored"
+
+    assert parse_versions(response) == {(1, 1, 1): "kept"}
+
+
+def test_text_outside_markers_is_ignored():
+    assert parse_versions("Sure! Here are the versions:\n&&version_1&& one") == {(1, 1, 1): "one"}
+    assert parse_versions("no markers at all") == {}
+    assert parse_versions("") == {}
+
+
+class ScriptedBackend(GenerationBackend):
+    model_name = "scripted"
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.prompts = []
+
+    def generate(self, prompt):
+        self.prompts.append(prompt)
+        return self.responses.pop(0)
+
+
+def test_missing_versions_are_re_requested():
+    # The first response lacks the second version of text 2 and truncates the first one of
+    # text 1; the follow-up prompt asks for exactly those two slots.
+    backend = ScriptedBackend([
+        "&&text_1_version_1&& a\n&&text_1_version_2&& a first text, again\n&&text_2_version_1&& another second text",
+        "&&text_1_version_1&& a first text, once more\n&&text_2_version_2&& the second text, again",
+    ])
+    augmentor = TextAugmentor(backend=backend, requests_per_minute=None)
+    events = []
+    augmentor.add_hook(lambda event, data: events.append(data) if event == "extraction" else None)
+    results = augmentor.augment_strings(["a first text", "a second text"], 2)
+
+    assert results == [
+        ["a first text, once more", "a first text, again"],
+        ["another second text", "the second text, again"],
+    ]
+    assert "&&text_1_version_1&&" in backend.prompts[1] and "&&text_2_version_2&&" in backend.prompts[1]
+    assert "&&text_1_version_2&&" not in backend.prompts[1]
+    assert events == [{"requested": 4, "missing": 2, "lost": 0, "followups": 1, "duplicates": 0}]
@@ -0,0 +1,65 @@
+import multiprocessing
+import os
+
+import pandas as pd
+import pytest
+
+from AIDataAugment import MockBackend, ShardRunner, merge_shards
+from AIDataAugment.ShardRunner import shard_filename
+
+
+def mock_backend(api_key):
+    return MockBackend(seed=len(api_key))
+
+
+def failing_backend(api_key):
+    raise RuntimeError(f"no backend for {api_key}")
+
+
+def source_frame(rows=40):
+    return pd.DataFrame({"id": range(rows), "text": [f"source text number {i} to rewrite" for i in range(rows)]})
+
+
+def test_run_merges_shards_in_source_order(tmp_path):
+    output = tmp_path / "out.csv"
+    runner = ShardRunner(["key-a", "key-bb"], num_shards=3, backend_factory=mock_backend, requests_per_minute=None)
+
+    shard_outputs = runner.run(str(output), dataframe=source_frame(), column_to_augment="text", total_augmentations=2)
+
+    assert len(shard_outputs) == 3
+    merged = pd.read_csv(output)
+    assert list(merged["id"]) == [i for i in range(40) for _ in range(2)]
+    assert "_source_row" not in merged.columns
+
+
+def test_run_with_more_shards_than_rows(tmp_path):
+    output = tmp_path / "out.csv"
+    runner = ShardRunner(["key-a"], num_shards=4, backend_factory=mock_backend, requests_per_minute=None)
+
+    shard_outputs = runner.run(str(output), dataframe=source_frame(2), column_to_augment="text", total_augmentations=2)
+
+    assert len(shard_outputs) == 4
+    assert sum(os.path.exists(path) for path in shard_outputs) < 4  # Some shards had no rows
+    assert list(pd.read_csv(output)["id"]) == [0, 0, 1, 1]
+    assert merge_shards(str(output), 4, remove_shards=True) == 4
+    assert sorted(os.listdir(tmp_path)) == ["out.csv"]
+
+
+def test_merge_rejects_unfinished_shards(tmp_path):
+    output = tmp_path / "out.csv"
+    ShardRunner(["key-a"], num_shards=2, backend_factory=mock_backend, requests_per_minute=None).run(
+        str(output), merge=False, dataframe=source_frame(), column_to_augment="text", total_augmentations=1)
+    os.remove(shard_filename(str(output), 1, 2))
+    os.remove(shard_filename(str(output), 1, 2) + ".journal")
+
+    with pytest.raises(FileNotFoundError, match="shard-00001-of-00002"):
+        merge_shards(str(output), 2)
+
+
+def test_failed_shard_shuts_down_the_manager(tmp_path):
+    runner = ShardRunner(["key-a"], num_shards=2, backend_factory=failing_backend, requests_per_minute=None)
+
+    with pytest.raises(RuntimeError, match="no backend"):
+        runner.run(str(tmp_path / "out.csv"), dataframe=source_frame(), column_to_augment="text", total_augmentations=1)
+
+    assert multiprocessing.active_children() == []
@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+from AIDataAugment import MockBackend, TextAugmentor
+from AIDataAugment.TextSegmenter import join_segments, split_text
+
+PARTS = ["word", "longerword", "x" * 30, ".", "!", "?", " ", "  ", "\n", "\n\n", "\t", " \n \n "]
+
+
+def random_text(rng):
+    return "".join(rng.choice(PARTS) for _ in range(rng.randint(0, 80)))
+
+
+def test_roundtrip_randomized():
+    rng = random.Random(0)
+    for _ in range(3000):
+        text = random_text(rng)
+        max_chars = rng.randint(5, 120)
+        segments = split_text(text, max_chars)
+
+        if not text.strip():
+            assert segments == []
+            continue
+        assert "".join(segment + separator for segment, separator in segments) == text
+        assert all(segment.strip() for segment, _ in segments)
+        lead = len(text) - len(text.lstrip())
+        assert all(len(segment) <= max_chars for segment, _ in segments[1:])
+        assert len(segments[0][0]) <= max_chars + lead
+
+
+@pytest.mark.parametrize("text", [
+    "  Leading spaces. Then a sentence.",
+    "\n\nStarts with a paragraph break.\n\nAnd another one.",
+    "First.  \n\n  Second paragraph starts with spaces.",
+    "Trailing whitespace.   \n",
+])
+def test_separators_kept(text):
+    segments = split_text(text, 12)
+
+    assert "".join(segment + separator for segment, separator in segments) == text
+
+
+def test_prefers_paragraphs_then_sentences():
+    text = "One. Two.\n\nThree. Four."
+
+    assert split_text(text, 10) == [("One. Two.", "\n\n"), ("Three.", " "), ("Four.", "")]
+    assert split_text(text, 100) == [(text, "")]
+
+
+def test_long_word_is_cut():
+    assert split_text("a" * 25, 10) == [("a" * 10, ""), ("a" * 10, ""), ("a" * 5, "")]
+
+
+def test_join_segments_uses_original_separators():
+    segments = split_text("One. Two.\n\nThree. Four.", 10)
+    rewritten = [segment.upper() for segment, _ in segments]
+
+    assert join_segments(rewritten, [separator for _, separator in segments]) == "ONE. TWO.\n\nTHREE. FOUR."
+
+
+def long_document(paragraphs=200):
+    rng = random.Random(2)
+    words = "the quick brown fox jumps over lazy dog while river flows under bridge".split()
+    sentence = lambda: " ".join(rng.choice(words) for _ in range(rng.randint(8, 20))).capitalize() + "."
+    return "\n\n".join(" ".join(sentence() for _ in range(rng.randint(3, 8))) for _ in range(paragraphs))
+
+
+def test_long_document_is_split_and_stitched():
+    text = long_document()
+    backend = MockBackend()
+    augmentor = TextAugmentor(backend=backend, requests_per_minute=None)
+    augmentor.max_char_input_limit = len(text) // 2  # Used to be skipped
+
+    versions = augmentor.augment_string(text, 3)
+
+    segments = split_text(text, augmentor._segment_chars(3))
+    assert len(segments) > 1
+    assert len(versions) == 3
+    # Mock versions are single lines: the stitched separators are those between segments.
+    assert all(version.count("\n\n") == sum(separator == "\n\n" for _, separator in segments[:-1]) for version in versions)
+    assert backend.calls == augmentor._long_document_calls(text, 3)
+
+
+def test_long_document_mode_off_skips():
+    text = long_document()
+    augmentor = TextAugmentor(backend=MockBackend(), requests_per_minute=None)
+    augmentor.long_document_mode = False
+    augmentor.max_char_input_limit = len(text) // 2
+
+    assert augmentor.augment_string(text, 3) is None